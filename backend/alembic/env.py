@@ -21,6 +21,11 @@ if config.config_file_name is not None:
 from models import Base
 target_metadata = Base.metadata
 
+# migrations always run on the sync driver, using the app's DATABASE_URL when it is set
+from database import DATABASE_URL
+if DATABASE_URL:
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -0,0 +1,37 @@
+"""Add full-text search index on tasks
+
+Revision ID: 3481ebb494ed
+Revises: da95eacbdf24
+Create Date: 2026-10-17 19:02:41.530218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3481ebb494ed'
+down_revision: Union[str, None] = 'da95eacbdf24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# must stay identical to models.task_search_document or the planner won't use the index
+SEARCH_DOCUMENT = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_tasks_search',
+            'tasks',
+            [sa.text(SEARCH_DOCUMENT)],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_search', table_name='tasks')
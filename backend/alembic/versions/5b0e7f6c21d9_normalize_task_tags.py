@@ -0,0 +1,97 @@
+"""Normalize task tags into a tags lookup table
+
+Revision ID: 5b0e7f6c21d9
+Revises: 3481ebb494ed
+Create Date: 2026-10-17 19:31:08.664102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e7f6c21d9'
+down_revision: Union[str, None] = '3481ebb494ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# ids are part of the schema: models.TAG_IDS numbers tag_classifier.TAG_CATEGORIES from 1 in this order
+TAGS = ["Work", "Urgent", "Personal", "Shopping", "Travel", "Health", "Learning", "Finance", "Others"]
+OTHERS_ID = TAGS.index("Others") + 1
+
+BATCH_SIZE = 5000
+
+# same cleanup as tag_classifier.canonical_category: "Work." and "**Personal**" count, anything else is Others
+BACKFILL_BATCH = sa.text(f"""
+    WITH batch AS (
+        SELECT id FROM tasks WHERE id > :after ORDER BY id LIMIT :limit
+    )
+    UPDATE tasks SET tag_id = coalesce(
+        (SELECT tags.id FROM tags
+         WHERE lower(tags.name) = lower(regexp_replace(coalesce(tasks.tags, ''), '[^A-Za-z]', '', 'g'))),
+        {OTHERS_ID}
+    )
+    FROM batch
+    WHERE tasks.id = batch.id
+    RETURNING tasks.id
+""")
+
+
+def upgrade() -> None:
+    tags = op.create_table(
+        'tags',
+        sa.Column('id', sa.SmallInteger(), autoincrement=False, nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.bulk_insert(tags, [{'id': i, 'name': name} for i, name in enumerate(TAGS, start=1)])
+
+    # nullable with no default, so adding it doesn't rewrite the table
+    op.add_column('tasks', sa.Column('tag_id', sa.SmallInteger(), nullable=True))
+    op.execute('ALTER TABLE tasks ADD CONSTRAINT fk_tasks_tag_id_tags FOREIGN KEY (tag_id) REFERENCES tags (id) NOT VALID')
+
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+
+        # keyset batches, each committed on its own, so row locks are short-lived
+        after = ''
+        while True:
+            ids = conn.execute(BACKFILL_BATCH, {'after': after, 'limit': BATCH_SIZE}).scalars().all()
+            if not ids:
+                break
+            after = max(ids)
+
+        op.create_index('ix_tasks_owner_id_tag_id', 'tasks', ['owner_id', 'tag_id'], unique=False, postgresql_concurrently=True)
+        op.execute('ALTER TABLE tasks VALIDATE CONSTRAINT fk_tasks_tag_id_tags')
+
+    # rows written by the old code while the backfill ran
+    op.execute(f"""
+        UPDATE tasks SET tag_id = coalesce(
+            (SELECT tags.id FROM tags
+             WHERE lower(tags.name) = lower(regexp_replace(coalesce(tasks.tags, ''), '[^A-Za-z]', '', 'g'))),
+            {OTHERS_ID}
+        )
+        WHERE tag_id IS NULL
+    """)
+
+    # a validated CHECK lets SET NOT NULL skip its full-table scan under an exclusive lock
+    op.execute('ALTER TABLE tasks ADD CONSTRAINT ck_tasks_tag_id_not_null CHECK (tag_id IS NOT NULL) NOT VALID')
+    op.execute('ALTER TABLE tasks VALIDATE CONSTRAINT ck_tasks_tag_id_not_null')
+    op.alter_column('tasks', 'tag_id', nullable=False, server_default=sa.text(str(OTHERS_ID)))
+    op.drop_constraint('ck_tasks_tag_id_not_null', 'tasks', type_='check')
+
+    op.drop_index('ix_tasks_owner_id_tags', table_name='tasks')
+    op.drop_column('tasks', 'tags')
+
+
+def downgrade() -> None:
+    op.add_column('tasks', sa.Column('tags', sa.String(), nullable=True))
+    op.execute('UPDATE tasks SET tags = tags.name FROM tags WHERE tags.id = tasks.tag_id')
+    op.create_index('ix_tasks_owner_id_tags', 'tasks', ['owner_id', 'tags'], unique=False)
+    op.drop_index('ix_tasks_owner_id_tag_id', table_name='tasks')
+    op.drop_constraint('fk_tasks_tag_id_tags', 'tasks', type_='foreignkey')
+    op.drop_column('tasks', 'tag_id')
+    op.drop_table('tags')
@@ -0,0 +1,42 @@
+"""Add task versions and tombstones for delta sync
+
+Revision ID: 8b8b29f161ba
+Revises: 9c1d3a350bf5
+Create Date: 2026-10-17 11:02:17.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b8b29f161ba'
+down_revision: Union[str, None] = '9c1d3a350bf5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('task_version', sa.Integer(), server_default='0', nullable=False))
+    # existing rows start at version 0, stamped with the migration time
+    op.add_column('tasks', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True))
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('task_tombstones',
+    sa.Column('task_id', sa.String(), nullable=False),
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_index('ix_task_tombstones_owner_id_version', 'task_tombstones', ['owner_id', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_task_tombstones_owner_id_version', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_column('tasks', 'version')
+    op.drop_column('tasks', 'updated_at')
+    op.drop_column('users', 'task_version')
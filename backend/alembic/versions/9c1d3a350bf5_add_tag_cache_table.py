@@ -0,0 +1,33 @@
+"""Add tag_cache table
+
+Revision ID: 9c1d3a350bf5
+Revises: 0aee2fc93ba4
+Create Date: 2026-10-17 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c1d3a350bf5'
+down_revision: Union[str, None] = '0aee2fc93ba4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('tag_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_tag_cache_created_at'), 'tag_cache', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_tag_cache_created_at'), table_name='tag_cache')
+    op.drop_table('tag_cache')
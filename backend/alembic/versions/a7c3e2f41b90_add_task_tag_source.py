@@ -0,0 +1,27 @@
+"""Record where each task's tag came from
+
+Revision ID: a7c3e2f41b90
+Revises: 5b0e7f6c21d9
+Create Date: 2026-10-17 21:14:52.310877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e2f41b90'
+down_revision: Union[str, None] = '5b0e7f6c21d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing rows stay NULL: a provisional guess can't be told apart from an LLM tag any more
+    op.add_column('tasks', sa.Column('tag_source', sa.String(length=16), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('tasks', 'tag_source')
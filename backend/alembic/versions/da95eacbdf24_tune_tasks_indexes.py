@@ -0,0 +1,42 @@
+"""Tune tasks indexes for owner-scoped queries
+
+Revision ID: da95eacbdf24
+Revises: 8b8b29f161ba
+Create Date: 2026-10-17 11:48:53.120377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'da95eacbdf24'
+down_revision: Union[str, None] = '8b8b29f161ba'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NEW_INDEXES = [
+    ('ix_tasks_owner_id_id', ['owner_id', 'id']),
+    ('ix_tasks_owner_id_completed', ['owner_id', 'completed']),
+    ('ix_tasks_owner_id_tags', ['owner_id', 'tags']),
+    ('ix_tasks_owner_id_version', ['owner_id', 'version']),
+]
+
+
+def upgrade() -> None:
+    # build concurrently on Postgres so writes to tasks aren't blocked
+    with op.get_context().autocommit_block():
+        for name, columns in NEW_INDEXES:
+            op.create_index(name, 'tasks', columns, unique=False, postgresql_concurrently=True)
+    # ix_tasks_id duplicates the primary key and nothing filters on title
+    op.drop_index('ix_tasks_id', table_name='tasks')
+    op.drop_index('ix_tasks_title', table_name='tasks')
+
+
+def downgrade() -> None:
+    op.create_index('ix_tasks_title', 'tasks', ['title'], unique=False)
+    op.create_index('ix_tasks_id', 'tasks', ['id'], unique=False)
+    for name, _ in reversed(NEW_INDEXES):
+        op.drop_index(name, table_name='tasks')
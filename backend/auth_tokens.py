@@ -0,0 +1,81 @@
+import os
+import time
+from typing import NamedTuple, Optional
+
+import jwt
+from cachetools import LRUCache
+
+
+class TokenUser(NamedTuple):
+    """The user a token was issued to, as its claims describe them."""
+    id: str
+    name: Optional[str]
+    email: Optional[str]
+    expires_at: float
+
+
+class TokenVerifier:
+    """
+    Issues and verifies the HS256 session tokens sockets authenticate with.
+
+    Tokens carry the user's id, name and email and expire after `ttl`
+    seconds, so verifying one needs no database lookup. Each is signed with
+    the active key and names it in its `kid` header; every key in `keys`
+    is still accepted, so a new key can be rolled out before the old one is
+    retired. Verified tokens are remembered (up to `cache_size`) until they
+    expire, which makes repeat verification a dict lookup.
+    """
+
+    algorithm = "HS256"
+
+    def __init__(self, keys: dict, active_kid: str, ttl: float = 3600, leeway: float = 30, cache_size: int = 1024, clock=time.time):
+        if active_kid not in keys:
+            raise ValueError(f"active key {active_kid!r} is not one of the configured keys")
+        self.keys = keys
+        self.active_kid = active_kid
+        self.ttl = ttl
+        self.leeway = leeway
+        self.clock = clock
+        # token -> TokenUser
+        self._verified = LRUCache(maxsize=cache_size)
+
+    @classmethod
+    def from_env(cls):
+        """
+        JWT_KEYS is a comma-separated list of kid:secret pairs and JWT_ACTIVE_KID
+        picks the one that signs (the first by default). Without JWT_KEYS,
+        SECRET_KEY is the only key, with kid "default".
+        """
+        if os.getenv("JWT_KEYS"):
+            keys = dict(pair.strip().split(":", 1) for pair in os.getenv("JWT_KEYS").split(",") if pair.strip())
+        else:
+            keys = {"default": os.getenv("SECRET_KEY")}
+        return cls(
+            keys,
+            active_kid=os.getenv("JWT_ACTIVE_KID", next(iter(keys))),
+            ttl=float(os.getenv("JWT_TTL", "3600")),
+            cache_size=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+        )
+
+    def issue(self, user_id: str, name: str = None, email: str = None) -> str:
+        now = int(self.clock())
+        claims = {"sub": user_id, "name": name, "email": email, "iat": now, "exp": now + int(self.ttl)}
+        return jwt.encode(claims, self.keys[self.active_kid], algorithm=self.algorithm, headers={"kid": self.active_kid})
+
+    def verify(self, token: str) -> TokenUser:
+        """Raises jwt.ExpiredSignatureError or another jwt.InvalidTokenError if the token isn't good."""
+        user = self._verified.get(token)
+        if user is not None:
+            if user.expires_at + self.leeway > self.clock():
+                return user
+            self._verified.pop(token, None)
+            raise jwt.ExpiredSignatureError("Signature has expired")
+
+        key = self.keys.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        claims = jwt.decode(token, key, algorithms=[self.algorithm], leeway=self.leeway, options={"require": ["sub", "exp"]})
+
+        user = TokenUser(claims["sub"], claims.get("name"), claims.get("email"), float(claims["exp"]))
+        self._verified[token] = user
+        return user
@@ -0,0 +1,113 @@
+"""
+Per-message authentication cost, old path against the token verifier.
+
+    python bench_auth.py --iterations 20000 --output auth.json
+
+    decode_and_lookup  os.getenv + jwt.decode + a users lookup (the old get_current_user)
+    verify_cold        TokenVerifier.verify on a token it hasn't seen (signature and claims checked)
+    verify_cached      TokenVerifier.verify on a token it has already verified
+
+Uses a fresh SQLite file unless DATABASE_URL is set; with Postgres, point
+it at a scratch database since the bench user is added to it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+
+def seed(user_id: str):
+    from database import Base, SessionLocal, engine
+    from models import User
+
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add(User(id=user_id, name="bench", email=f"{user_id}@bench.local"))
+        db.commit()
+
+
+async def decode_and_lookup(token: str, iterations: int) -> float:
+    import jwt
+
+    import task_queries
+    from database import AsyncSessionLocal
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(task_queries.user_by_id(payload["user_id"]))
+            result.scalars().first()
+    return time.perf_counter() - started
+
+
+def verify_cold(verifier, tokens: list) -> float:
+    started = time.perf_counter()
+    for token in tokens:
+        verifier.verify(token)
+    return time.perf_counter() - started
+
+
+def verify_cached(verifier, token: str, iterations: int) -> float:
+    verifier.verify(token)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        verifier.verify(token)
+    return time.perf_counter() - started
+
+
+def per_call(seconds: float, iterations: int) -> dict:
+    return {"iterations": iterations, "total_s": round(seconds, 4), "per_call_us": round(seconds / iterations * 1e6, 2)}
+
+
+async def run(args) -> dict:
+    import jwt
+
+    from auth_tokens import TokenVerifier
+    from database import async_engine
+
+    user_id = f"bench-{uuid.uuid4().hex[:8]}"
+    seed(user_id)
+
+    legacy_token = jwt.encode({"user_id": user_id}, os.getenv("SECRET_KEY"), algorithm="HS256")
+    # slower paths get fewer iterations, per-call numbers are comparable
+    lookups = max(args.iterations // 20, 1)
+    report = {"decode_and_lookup": per_call(await decode_and_lookup(legacy_token, lookups), lookups)}
+
+    verifier = TokenVerifier({"bench": os.getenv("SECRET_KEY")}, "bench", cache_size=args.iterations)
+    # distinct tokens, so every verification is a miss
+    tokens = [verifier.issue(user_id, f"bench {i}", f"{user_id}@bench.local") for i in range(args.iterations)]
+    report["verify_cold"] = per_call(verify_cold(verifier, tokens), len(tokens))
+    report["verify_cached"] = per_call(verify_cached(verifier, tokens[0], args.iterations), args.iterations)
+
+    report["speedup_cached"] = round(report["decode_and_lookup"]["per_call_us"] / report["verify_cached"]["per_call_us"], 1)
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-message token verification")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ai-task-auth-"), "bench.db")
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key-of-at-least-32-bytes")
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Import-time report for the backend, to catch cold-start regressions.
+
+Imports main in fresh interpreters with -X importtime and reports the
+median total, the slowest modules, and whether any of the SDKs that are
+meant to load lazily (on first use) got imported at startup.
+
+    python bench_startup.py --output startup.json
+    python bench_startup.py --max-ms 1500      # exit 1 if slower, or if a lazy SDK is imported
+
+Uses a throwaway SQLite DATABASE_URL unless one is set; nothing connects.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# loaded on first use by tag_clients and get_oauth, never at import time
+LAZY_MODULES = ("openai", "google.generativeai", "grpc", "authlib", "httpx")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """{module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def import_once(module: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long importing the app takes")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--max-ms", type=float, help="fail if the median import takes longer")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ai-task-startup-"), "startup.db"))
+    env.setdefault("SECRET_KEY", "bench")
+
+    runs = [import_once(args.module, env) for _ in range(args.repeat)]
+    totals = [run[args.module][1] / 1000 for run in runs]
+    median_run = sorted(runs, key=lambda run: run[args.module][1])[len(runs) // 2]
+
+    # top-level packages only, their submodules are included in the cumulative time
+    packages = {name: times for name, times in median_run.items() if "." not in name and name != args.module}
+    slowest = sorted(packages.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    eager = sorted({
+        lazy for run in runs for name in run for lazy in LAZY_MODULES
+        if name == lazy or name.startswith(lazy + ".")
+    })
+
+    report = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "median_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "slowest_packages_ms": {name: round(cumulative / 1000, 1) for name, (_, cumulative) in slowest},
+        "lazy_modules_imported": eager,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    failed = bool(eager)
+    if args.max_ms is not None and report["median_ms"] > args.max_ms:
+        print(f"median import {report['median_ms']}ms is over the {args.max_ms}ms budget", file=sys.stderr)
+        failed = True
+    if eager:
+        print(f"imported at startup but meant to be lazy: {', '.join(eager)}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
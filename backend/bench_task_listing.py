@@ -0,0 +1,153 @@
+"""
+Compares the get_tasks read path against full ORM hydration for one user
+with many tasks: pages through every task both ways and reports wall time,
+peak Python memory and encoded bytes.
+
+    python bench_task_listing.py --tasks 50000 --output listing.json
+
+    orm         select(Task), then task_to_dict on each instance (the old path)
+    projection  task_queries.task_page, plain rows straight to the encoder
+
+Uses a fresh SQLite file unless DATABASE_URL is set; with Postgres, point
+it at a scratch database since the bench user is added to it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+DESCRIPTION = (
+    "Go through the quarterly numbers with the finance team, reconcile the travel "
+    "expenses against the receipts folder, flag anything over budget and prepare "
+    "a short summary for Monday's planning meeting with the open questions. "
+)
+
+
+def seed(user_id: str, count: int):
+    from sqlalchemy import insert
+
+    from database import Base, engine
+    from models import User, Task, TAG_IDS
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": user_id, "name": "bench", "email": f"{user_id}@bench.local"}])
+        for start in range(0, count, 5000):
+            conn.execute(insert(Task), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "title": f"Task {i}",
+                    "description": DESCRIPTION * (1 + i % 3),
+                    "completed": i % 4 == 0,
+                    "tag_id": TAG_IDS["Work"],
+                    "owner_id": user_id,
+                    "version": 0,
+                }
+                for i in range(start, min(start + 5000, count))
+            ])
+
+
+async def list_orm(db, user_id: str, page_size: int) -> int:
+    from sqlalchemy import select
+
+    from main import task_to_dict
+    from models import Task
+    from serialization import Frame
+
+    sent = 0
+    cursor = None
+    while True:
+        query = select(Task).filter(Task.owner_id == user_id).order_by(Task.id).limit(page_size + 1)
+        if cursor:
+            query = query.filter(Task.id > cursor)
+        tasks = (await db.execute(query)).scalars().all()
+        cursor = tasks[page_size - 1].id if len(tasks) > page_size else None
+        sent += len(Frame.encode({"event": "task_list", "tasks": [task_to_dict(t) for t in tasks[:page_size]]}).data)
+        # the session stays open across pages, as it does for a socket message
+        db.expunge_all()
+        if cursor is None:
+            return sent
+
+
+async def list_projection(db, user_id: str, page_size: int) -> int:
+    import task_queries
+    from serialization import Frame
+
+    sent = 0
+    cursor = None
+    while True:
+        rows = (await db.execute(task_queries.task_page(user_id, cursor, page_size))).all()
+        cursor = rows[page_size - 1].id if len(rows) > page_size else None
+        sent += len(Frame.encode({"event": "task_list", "tasks": [row._asdict() for row in rows[:page_size]]}).data)
+        if cursor is None:
+            return sent
+
+
+async def measure(fn, user_id: str, page_size: int, repeat: int) -> dict:
+    from database import AsyncSessionLocal
+
+    times = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            sent = await fn(db, user_id, page_size)
+            times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    async with AsyncSessionLocal() as db:
+        await fn(db, user_id, page_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "best_s": round(min(times), 4),
+        "mean_s": round(sum(times) / len(times), 4),
+        "peak_kib": round(peak / 1024, 1),
+        "bytes_sent": sent,
+    }
+
+
+async def run(args) -> dict:
+    from database import async_engine
+
+    user_id = f"bench-{uuid.uuid4().hex[:8]}"
+    seed(user_id, args.tasks)
+
+    report = {"tasks": args.tasks, "page_size": args.page_size, "repeat": args.repeat}
+    report["orm"] = await measure(list_orm, user_id, args.page_size, args.repeat)
+    report["projection"] = await measure(list_projection, user_id, args.page_size, args.repeat)
+    report["speedup"] = round(report["orm"]["best_s"] / report["projection"]["best_s"], 2)
+    report["peak_memory_ratio"] = round(report["projection"]["peak_kib"] / report["orm"]["peak_kib"], 2)
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the task listing read path")
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--page-size", type=int, default=int(os.getenv("TASKS_PAGE_SIZE", "200")))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ai-task-bench-"), "bench.db")
+    os.environ.setdefault("SECRET_KEY", "bench")
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
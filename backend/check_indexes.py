@@ -0,0 +1,101 @@
+"""
+EXPLAINs every statement in task_queries against DATABASE_URL and fails if
+any of them has to scan a whole table instead of using an index.
+
+    python check_indexes.py
+
+Works on Postgres (sequential scans are disabled for the session so the
+planner reports whether an index is usable at all, even on tiny tables)
+and on SQLite.
+"""
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+import task_queries
+from database import engine
+
+SAMPLE_USER = "check-user"
+SAMPLE_TASK = "00000000-0000-0000-0000-000000000000"
+
+STATEMENTS = {
+    "user_by_id": task_queries.user_by_id(SAMPLE_USER),
+    "user_by_email": task_queries.user_by_email("check@example.com"),
+    "user_task_version": task_queries.user_task_version(SAMPLE_USER),
+    "bump_task_version": task_queries.bump_task_version(SAMPLE_USER),
+    "owned_task": task_queries.owned_task(SAMPLE_USER, SAMPLE_TASK),
+    "task_page": task_queries.task_page(SAMPLE_USER, limit=200),
+    "task_page_cursor": task_queries.task_page(SAMPLE_USER, cursor=SAMPLE_TASK, limit=200),
+    "task_page_tag": task_queries.task_page(SAMPLE_USER, limit=200, tag="Work"),
+    "task_page_completed": task_queries.task_page(SAMPLE_USER, limit=200, completed=False),
+    "task_page_search": task_queries.task_page(SAMPLE_USER, limit=200, search="quarterly report"),
+    "task_counts": task_queries.task_counts(SAMPLE_USER),
+    "changed_tasks_version": task_queries.changed_tasks(SAMPLE_USER, since_version=10),
+    "changed_tasks_since": task_queries.changed_tasks(SAMPLE_USER, since=datetime(2025, 1, 1)),
+    "changed_tasks_cursor": task_queries.changed_tasks(SAMPLE_USER, since_version=10, cursor=SAMPLE_TASK),
+    "deleted_task_ids_version": task_queries.deleted_task_ids(SAMPLE_USER, since_version=10),
+    "deleted_task_ids_since": task_queries.deleted_task_ids(SAMPLE_USER, since=datetime(2025, 1, 1)),
+    "delete_owned_tasks": task_queries.delete_owned_tasks(SAMPLE_USER, [SAMPLE_TASK, SAMPLE_TASK]),
+    "set_owned_tasks_completed": task_queries.set_owned_tasks_completed(SAMPLE_USER, [SAMPLE_TASK, SAMPLE_TASK], True, 10),
+}
+
+
+def compile_sql(statement) -> str:
+    return str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def postgres_seq_scans(conn, sql: str):
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            scans.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+
+def sqlite_seq_scans(conn, sql: str):
+    scans = []
+    for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+        detail = row[-1]
+        # "SCAN tasks" is a full table scan, "SCAN tasks USING INDEX ..." walks an index
+        # and "SCAN tasks_fts VIRTUAL TABLE INDEX ..." is an FTS5 lookup
+        if detail.startswith("SCAN ") and " USING " not in detail and " VIRTUAL TABLE INDEX " not in detail:
+            scans.append(detail.split()[1])
+    return scans
+
+
+def main():
+    postgres = engine.dialect.name == "postgresql"
+    failures = 0
+
+    with engine.connect() as conn:
+        if postgres:
+            conn.execute(text("SET enable_seqscan = off"))
+
+        for name, statement in STATEMENTS.items():
+            sql = compile_sql(statement)
+            scans = postgres_seq_scans(conn, sql) if postgres else sqlite_seq_scans(conn, sql)
+            if scans:
+                failures += 1
+                print(f"✗ {name}: full scan on {', '.join(scans)}")
+            else:
+                print(f"✓ {name}")
+
+        conn.rollback()
+
+    if failures:
+        print(f"{failures} of {len(STATEMENTS)} queries are not using an index")
+        sys.exit(1)
+    print(f"All {len(STATEMENTS)} queries use an index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+
+from fastapi import WebSocket
+
+from serialization import Frame
+
+logger = logging.getLogger(__name__)
+
+
+class ClientConnection:
+    """
+    One WebSocket plus its outbound queue. Frames are written by a dedicated
+    task, so a stalled client only ever blocks itself. A client that falls
+    more than `max_queue` frames behind, or takes longer than `send_timeout`
+    to accept one, is disconnected. With `binary`, frames go out as UTF-8
+    bytes instead of text.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int = 100, send_timeout: float = 5.0, binary: bool = False):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.binary = binary
+        self.user_id = None
+        self.closed = False
+
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._writer = None
+        self._closer = None
+
+    @classmethod
+    def from_env(cls, websocket: WebSocket):
+        return cls(
+            websocket,
+            max_queue=int(os.getenv("WS_SEND_QUEUE", "100")),
+            send_timeout=float(os.getenv("WS_SEND_TIMEOUT", "5")),
+            binary=os.getenv("WS_FRAMES", "text").lower() == "binary",
+        )
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def send(self, message: dict) -> bool:
+        return self.send_frame(Frame.encode(message))
+
+    def send_frame(self, frame: Frame) -> bool:
+        """Queues a frame without waiting. Returns False if the connection is closed or was dropped."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            logger.warning("Dropping slow client %s: %d frames pending", self.websocket.client, self.max_queue)
+            self._abort()
+            return False
+        return True
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self._queue.get()
+                if self.binary:
+                    sending = self.websocket.send_bytes(frame.data)
+                else:
+                    sending = self.websocket.send_text(frame.text)
+                await asyncio.wait_for(sending, self.send_timeout)
+                self._queue.task_done()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Send to %s failed, closing: %r", self.websocket.client, e)
+            self._abort()
+
+    def _abort(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        # unblocks the receive loop in the endpoint
+        self._closer = asyncio.create_task(self._close_socket(code=1013))
+
+    async def _close_socket(self, code: int = 1000):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def close(self, drain_timeout: float = 1.0):
+        """Flushes queued frames (up to `drain_timeout`), then closes the socket."""
+        if self.closed:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+        await self._close_socket()
+
+    def stop(self):
+        """Stops the writer after the client has gone away."""
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+
+
+class ConnectionRegistry:
+    """Live connections grouped by the user they are authenticated as."""
+
+    def __init__(self):
+        self._by_user = defaultdict(set)
+
+    def __len__(self):
+        return sum(len(conns) for conns in self._by_user.values())
+
+    def register(self, user_id: str, connection: ClientConnection):
+        if connection.user_id == user_id:
+            return
+        self.unregister(connection)
+        connection.user_id = user_id
+        self._by_user[user_id].add(connection)
+
+    def unregister(self, connection: ClientConnection):
+        conns = self._by_user.get(connection.user_id)
+        if conns is None:
+            return
+        conns.discard(connection)
+        if not conns:
+            del self._by_user[connection.user_id]
+
+    def send_to_user(self, user_id: str, message: dict) -> int:
+        return self.send_frame_to_user(user_id, Frame.encode(message))
+
+    def send_frame_to_user(self, user_id: str, frame: Frame) -> int:
+        """Queues one encoded frame on every socket of one user. Returns how many accepted it."""
+        conns = self._by_user.get(user_id)
+        if not conns:
+            return 0
+        return sum(conn.send_frame(frame) for conn in list(conns))
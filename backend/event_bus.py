@@ -0,0 +1,201 @@
+"""
+Pub/sub for task events so every worker can reach the sockets it holds.
+
+EVENT_BUS selects the backend:
+    memory    single process, events never leave the worker (default)
+    postgres  LISTEN/NOTIFY on DATABASE_URL
+    redis     PUBLISH/SUBSCRIBE on REDIS_URL (needs the `redis` package)
+"""
+import asyncio
+import logging
+import os
+import uuid
+
+from serialization import Frame, dumps, loads
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "task_events")
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+PG_NOTIFY_LIMIT = 7900
+
+
+class EventBus:
+    """
+    In-process bus, and the base for the cross-process ones.
+    Events are delivered to local sockets straight away. Remote backends
+    also publish them, and drop the echo of their own messages.
+
+    A message is encoded once, by the worker that publishes it. The wire
+    payload is a small JSON header line followed by the frame bytes, so
+    receiving workers forward the frame to their sockets without
+    decoding or re-encoding it. An event bigger than the backend carries
+    goes to other workers as a small "resync" event instead, telling the
+    owner's clients there that they missed something and should reload.
+    """
+
+    # largest wire payload the backend accepts, None if there's no limit
+    max_payload = None
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self.handler = None
+
+    async def start(self, handler):
+        """`handler(owner_id, frame)` delivers an encoded event to this worker's sockets."""
+        self.handler = handler
+
+    async def stop(self):
+        pass
+
+    async def publish(self, owner_id: str, message: dict) -> int:
+        frame = Frame.encode(message)
+        delivered = self.handler(owner_id, frame)
+        payload = self._wire(owner_id, frame)
+        if self.max_payload is not None and len(payload) > self.max_payload:
+            logger.warning("Event too large to publish (%d bytes), sending a resync to other workers", len(payload))
+            payload = self._wire(owner_id, Frame.encode({"event": "resync", "owner_id": owner_id}))
+        # this worker's sockets already have it, a bus outage shouldn't fail the sender
+        try:
+            await self._publish(payload)
+        except Exception:
+            logger.exception("Could not publish %s to other workers", message.get("event"))
+        return delivered
+
+    def _wire(self, owner_id: str, frame: Frame) -> bytes:
+        return dumps([self.origin, owner_id]) + b"\n" + frame.data
+
+    async def _publish(self, payload: bytes):
+        pass
+
+    def _receive(self, payload):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        header, _, body = payload.partition(b"\n")
+        origin, owner_id = loads(header)
+        if origin == self.origin:
+            return
+        self.handler(owner_id, Frame(data=body))
+
+
+class PostgresEventBus(EventBus):
+    max_payload = PG_NOTIFY_LIMIT
+
+    def __init__(self, dsn: str, channel: str = CHANNEL):
+        super().__init__()
+        # asyncpg wants a plain postgresql:// DSN, without a SQLAlchemy driver suffix
+        scheme, sep, rest = dsn.partition("://")
+        self.dsn = scheme.split("+")[0] + sep + rest
+        self.channel = channel
+        self._listener = None
+        self._pool = None
+        self._relisten = None
+        self._stopping = False
+
+    async def start(self, handler):
+        import asyncpg
+
+        await super().start(handler)
+        self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+        await self._listen()
+
+    async def stop(self):
+        self._stopping = True
+        if self._relisten is not None:
+            self._relisten.cancel()
+            await asyncio.gather(self._relisten, return_exceptions=True)
+        if self._listener is not None:
+            await self._listener.close()
+        if self._pool is not None:
+            await self._pool.close()
+
+    async def _listen(self):
+        import asyncpg
+
+        self._listener = await asyncpg.connect(self.dsn)
+        self._listener.add_termination_listener(self._on_listener_closed)
+        await self._listener.add_listener(self.channel, self._on_notify)
+
+    def _on_listener_closed(self, connection):
+        if self._stopping or self._relisten is not None:
+            return
+        logger.error("LISTEN connection on %s was closed, events from other workers are lost until it is back", self.channel)
+        self._relisten = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self, max_delay: float = 30):
+        delay = 1
+        try:
+            while True:
+                try:
+                    await self._listen()
+                except Exception as e:
+                    logger.error("Could not LISTEN on %s again, retrying in %ds: %s", self.channel, delay, e)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, max_delay)
+                else:
+                    logger.warning("Listening on %s again", self.channel)
+                    return
+        finally:
+            self._relisten = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._receive(payload)
+
+    async def _publish(self, payload: bytes):
+        await self._pool.execute("SELECT pg_notify($1, $2)", self.channel, payload.decode("utf-8"))
+
+
+class RedisEventBus(EventBus):
+    def __init__(self, url: str, channel: str = CHANNEL, client=None):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self.client = client
+        self._pubsub = None
+        self._reader = None
+
+    async def start(self, handler):
+        await super().start(handler)
+        if self.client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("EVENT_BUS=redis needs the `redis` package installed")
+            self.client = redis.from_url(self.url)
+
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def stop(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.aclose()
+        await self.client.aclose()
+
+    async def _read_loop(self):
+        async for item in self._pubsub.listen():
+            if item["type"] != "message":
+                continue
+            try:
+                self._receive(item["data"])
+            except Exception as e:
+                logger.warning("Bad event on %s: %s", self.channel, e)
+
+    async def _publish(self, payload: bytes):
+        await self.client.publish(self.channel, payload)
+
+
+def create_event_bus(kind: str = None) -> EventBus:
+    kind = (kind or os.getenv("EVENT_BUS", "memory")).lower()
+    if kind == "memory":
+        return EventBus()
+    if kind == "postgres":
+        return PostgresEventBus(os.getenv("DATABASE_URL"))
+    if kind == "redis":
+        return RedisEventBus(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown EVENT_BUS {kind!r}, expected memory, postgres or redis")
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+
+from micro_batch import MicroBatch, settle
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitter:
+    """
+    Runs small write operations from every socket on this worker in shared
+    transactions. Operations are collected for up to `window` seconds or until
+    `max_batch` are pending, applied in one session and committed once; each
+    caller resumes only after that commit, so nothing is acknowledged before
+    it is durable. Flushes run one at a time, the next batch fills up while
+    the current one commits. If a batch fails, it is rolled back and every
+    operation in it is retried in its own transaction.
+
+    A window of 0 (the default) commits each operation on its own.
+    """
+
+    def __init__(self, session_factory, window: float = 0, max_batch: int = 64):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+
+        self._batch = MicroBatch(self._flush, window, max_batch)
+        self._flush_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls, session_factory):
+        return cls(
+            session_factory,
+            window=float(os.getenv("WRITE_BATCH_WINDOW_MS", "0")) / 1000,
+            max_batch=int(os.getenv("WRITE_BATCH_SIZE", "64")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_batch > 1
+
+    def __len__(self):
+        return len(self._batch)
+
+    async def run(self, operation):
+        """
+        Awaits `operation(db)` inside a batch transaction and returns its result
+        once the batch has committed. The operation may be run twice (alone,
+        after its batch failed), so it should build its objects itself.
+        """
+        if not self.enabled:
+            return await self._run_alone(operation)
+        return await self._batch.submit(operation)
+
+    async def _run_alone(self, operation):
+        async with self.session_factory() as db:
+            result = await operation(db)
+            await db.commit()
+            return result
+
+    async def _flush(self, batch):
+        async with self._flush_lock:
+            try:
+                async with self.session_factory() as db:
+                    results = []
+                    for operation, _ in batch:
+                        results.append(await operation(db))
+                        # later operations in the batch see this one's rows (the session doesn't autoflush)
+                        await db.flush()
+                    await db.commit()
+            except Exception as e:
+                if len(batch) == 1:
+                    settle(batch[0][1], e)
+                    return
+                logger.warning("Group commit of %d writes failed, retrying one by one: %s", len(batch), e)
+                for operation, future in batch:
+                    try:
+                        result = await self._run_alone(operation)
+                    except Exception as e:
+                        result = e
+                    settle(future, result)
+                return
+
+        for (_, future), result in zip(batch, results):
+            settle(future, result)
+
+    async def stop(self):
+        """Commits whatever is pending and waits for flushes in progress."""
+        await self._batch.stop()
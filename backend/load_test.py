@@ -0,0 +1,340 @@
+"""
+Load harness for the /ws task API.
+
+Starts main.app in-process on a local port with a fake tagging provider
+(no network access needed), opens --clients concurrent sockets, one user
+each, and replays a weighted mix of get_tasks / add_task / delete_task
+for --duration seconds. Every client keeps one request in flight and
+times it until the matching reply arrives. Throughput and p50/p95/p99
+latency per action are written as JSON.
+
+    python load_test.py --clients 50 --duration 30 --output bench.json
+    python load_test.py --database-url postgresql://localhost/ai_task_bench
+    python load_test.py --tag-latency-ms 800 --always-llm
+    python load_test.py --mix add_task=4,delete_task=1 --write-batch-ms 5
+
+The database is a fresh SQLite file unless --database-url is given; with
+Postgres, point it at a scratch database since seeded users are added to it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import deque
+
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import (
+    AcceptConnection,
+    BytesMessage,
+    CloseConnection,
+    Message,
+    Ping,
+    RejectConnection,
+    Request,
+    TextMessage,
+)
+
+# reply that completes each action; anything else on the socket (task_tagged, ...) is a side event
+REPLY_EVENTS = {
+    "get_tasks": "task_list",
+    "add_task": "task_created",
+    "delete_task": "task_deleted",
+}
+
+SAMPLE_TASKS = [
+    ("Fix login bug", "Users get logged out after refreshing the dashboard"),
+    ("Buy groceries", "Milk, eggs, bread and coffee"),
+    ("Morning run", "5k around the park before work"),
+    ("Pay electricity bill", "Due on the 15th"),
+    ("Read chapter 4", "Distributed systems book, take notes"),
+    ("Plan team offsite", "Book venue and send the agenda"),
+    ("Call mom", "Ask about the weekend plans"),
+    ("Review pull request", "Check the new pagination code"),
+]
+
+
+class WebSocketClient:
+    """Bare-bones asyncio WebSocket client on wsproto, which uvicorn already depends on."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ws = WSConnection(ConnectionType.CLIENT)
+        self._events = deque()
+        self._parts = []
+
+    @classmethod
+    async def connect(cls, host: str, port: int, path: str = "/ws"):
+        reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer)
+        await client._write(Request(host=f"{host}:{port}", target=path))
+        event = await client._next_event()
+        if not isinstance(event, AcceptConnection):
+            raise ConnectionError(f"handshake rejected: {event!r}")
+        return client
+
+    async def _write(self, event):
+        self.writer.write(self.ws.send(event))
+        await self.writer.drain()
+
+    async def _next_event(self):
+        while not self._events:
+            data = await self.reader.read(65536)
+            if not data:
+                raise ConnectionError("connection closed by server")
+            self.ws.receive_data(data)
+            self._events.extend(self.ws.events())
+        return self._events.popleft()
+
+    async def send(self, message: dict):
+        await self._write(Message(data=json.dumps(message)))
+
+    async def receive(self) -> dict:
+        while True:
+            event = await self._next_event()
+            # the server sends text frames by default and UTF-8 bytes with WS_FRAMES=binary
+            if isinstance(event, (TextMessage, BytesMessage)):
+                self._parts.append(event.data)
+                if event.message_finished:
+                    data = "".join(self._parts) if isinstance(event, TextMessage) else b"".join(self._parts)
+                    self._parts = []
+                    return json.loads(data)
+            elif isinstance(event, Ping):
+                await self._write(event.response())
+            elif isinstance(event, (CloseConnection, RejectConnection)):
+                raise ConnectionError(f"server closed the socket: {event!r}")
+
+    async def close(self):
+        try:
+            await self._write(CloseConnection(code=1000))
+        except Exception:
+            pass
+        self.writer.close()
+
+
+def percentile(sorted_samples, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return None
+    rank = max(1, round(p / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def summarize(samples, errors: int, elapsed: float) -> dict:
+    samples = sorted(samples)
+    ms = lambda s: round(s * 1000, 3) if s is not None else None
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0,
+        "mean_ms": ms(sum(samples) / len(samples)) if samples else None,
+        "p50_ms": ms(percentile(samples, 50)),
+        "p95_ms": ms(percentile(samples, 95)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "max_ms": ms(samples[-1]) if samples else None,
+    }
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        action, _, weight = part.partition("=")
+        action = action.strip()
+        if action not in REPLY_EVENTS:
+            raise argparse.ArgumentTypeError(f"unknown action {action!r}, expected one of {', '.join(REPLY_EVENTS)}")
+        mix[action] = float(weight or 1)
+    return mix
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def seed_users(clients: int, tasks_per_user: int):
+    """Creates one bench user per client with some existing tasks and returns their ids."""
+    from database import Base, engine, SessionLocal
+    from models import User, Task
+
+    Base.metadata.create_all(engine)
+    run = uuid.uuid4().hex[:8]
+    user_ids = [f"bench-{run}-{i}" for i in range(clients)]
+
+    with SessionLocal() as db:
+        for user_id in user_ids:
+            db.add(User(id=user_id, name=user_id, email=f"{user_id}@bench.local"))
+        db.flush()
+        for user_id in user_ids:
+            for i in range(tasks_per_user):
+                title, description = SAMPLE_TASKS[i % len(SAMPLE_TASKS)]
+                db.add(Task(id=str(uuid.uuid4()), title=title, description=description, tags="Others", owner_id=user_id))
+        db.commit()
+    return user_ids
+
+
+def install_fake_tagger(main, latency: float):
+    """Swaps the LLM calls behind the tagging pipeline for a sleep and a random category."""
+    from tag_classifier import TAG_CATEGORIES
+
+    async def fake_single(title, description):
+        await asyncio.sleep(latency)
+        return random.choice(TAG_CATEGORIES)
+
+    async def fake_batch(tasks):
+        await asyncio.sleep(latency)
+        return [random.choice(TAG_CATEGORIES) for _ in tasks]
+
+    main.tag_batcher.single_tagger = fake_single
+    main.tag_batcher.batch_tagger = fake_batch
+
+
+async def run_client(host, port, token, mix, deadline, stats, stop_sending):
+    client = await WebSocketClient.connect(host, port)
+    task_ids = []
+    actions, weights = list(mix), list(mix.values())
+    try:
+        # initial load, also authenticates the socket
+        await client.send({"action": "get_tasks", "token": token})
+        reply = await client.receive()
+        task_ids.extend(task["id"] for task in reply.get("tasks", []))
+
+        while time.perf_counter() < deadline and not stop_sending.is_set():
+            action = random.choices(actions, weights)[0]
+            if action == "delete_task" and not task_ids:
+                action = "add_task"
+
+            message = {"action": action, "token": token}
+            if action == "add_task":
+                title, description = random.choice(SAMPLE_TASKS)
+                message["task"] = {"title": f"{title} #{random.randint(0, 10**6)}", "description": description}
+            elif action == "delete_task":
+                message["task_id"] = task_ids.pop(random.randrange(len(task_ids)))
+
+            started = time.perf_counter()
+            await client.send(message)
+            while True:
+                reply = await client.receive()
+                if "error" in reply:
+                    stats[action]["errors"] += 1
+                    break
+                if reply.get("event") == REPLY_EVENTS[action]:
+                    stats[action]["samples"].append(time.perf_counter() - started)
+                    if action == "add_task":
+                        task_ids.append(reply["task"]["id"])
+                    break
+                stats["side_events"] += 1
+    finally:
+        await client.close()
+
+
+async def run(args) -> dict:
+    import uvicorn
+    import main
+
+    install_fake_tagger(main, args.tag_latency_ms / 1000)
+    user_ids = seed_users(args.clients, args.seed_tasks)
+    tokens = [main.token_verifier.issue(user_id, user_id, f"{user_id}@bench.local") for user_id in user_ids]
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host=args.host, port=args.port, ws="wsproto", log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    stats = {action: {"samples": [], "errors": 0} for action in REPLY_EVENTS}
+    stats["side_events"] = 0
+    stop_sending = asyncio.Event()
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    results = await asyncio.gather(
+        *(run_client(args.host, port, token, args.mix, deadline, stats, stop_sending) for token in tokens),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+    await serving
+
+    failed = [r for r in results if isinstance(r, BaseException)]
+    all_samples = [s for action in REPLY_EVENTS for s in stats[action]["samples"]]
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "database": args.database_url.split("://")[0],
+        "config": {
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "seed_tasks": args.seed_tasks,
+            "tag_latency_ms": args.tag_latency_ms,
+            "always_llm": args.always_llm,
+            "write_batch_ms": args.write_batch_ms,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(all_samples, sum(stats[a]["errors"] for a in REPLY_EVENTS), elapsed),
+        "actions": {action: summarize(stats[action]["samples"], stats[action]["errors"], elapsed) for action in REPLY_EVENTS},
+        "side_events": stats["side_events"],
+        "client_failures": [repr(e) for e in failed],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a mixed WebSocket workload and report latency percentiles")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent sockets, one user each")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to send requests for")
+    parser.add_argument("--mix", type=parse_mix, default="get_tasks=5,add_task=4,delete_task=1", help="action=weight,...")
+    parser.add_argument("--seed-tasks", type=int, default=50, help="tasks each user starts with")
+    parser.add_argument("--tag-latency-ms", type=float, default=200, help="latency of the fake tagging provider")
+    parser.add_argument("--always-llm", action="store_true", help="send every new task to the (fake) LLM instead of the local classifier")
+    parser.add_argument("--write-batch-ms", type=float, help="group-commit task writes in windows this long (WRITE_BATCH_WINDOW_MS)")
+    parser.add_argument("--database-url", help="defaults to a fresh SQLite file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the workload")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.database_url is None:
+        args.database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ai-task-bench-"), "bench.db")
+
+    # main and database read these at import time
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("SECRET_KEY", "load-test")
+    os.environ.setdefault("EVENT_BUS", "memory")
+    # measure the pipeline, not the per-user rate limits (set these explicitly to include them)
+    os.environ.setdefault("RATE_LIMIT_CHEAP_RATE", "0")
+    os.environ.setdefault("RATE_LIMIT_EXPENSIVE_RATE", "0")
+    os.environ.setdefault("RATE_LIMIT_SUGGEST_RATE", "0")
+    if args.always_llm:
+        os.environ["TAG_LOCAL_THRESHOLD"] = "1.1"
+    if args.write_batch_ms is not None:
+        os.environ["WRITE_BATCH_WINDOW_MS"] = str(args.write_batch_ms)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if report["client_failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
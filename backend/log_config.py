@@ -0,0 +1,104 @@
+"""
+Structured logging for the backend.
+
+Records are handed to a queue on the calling thread and formatted, redacted
+and written by a listener thread, so the event loop never blocks on stdout.
+Per-message DEBUG logs on hot paths are additionally sampled by LOG_SAMPLE_RATE.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import time
+
+SECRET_ENV_VARS = ("GEMINI_API_KEY", "OPENAI_API_KEY", "SECRET_KEY", "GOOGLE_CLIENT_SECRET", "DATABASE_URL")
+
+# JWTs and bearer-style keys that may show up inside logged payloads
+SECRET_PATTERNS = [
+    re.compile(r"eyJ[\w-]+\.eyJ[\w-]+\.[\w-]+"),
+    re.compile(r"\bsk-[A-Za-z0-9_-]{16,}"),
+    re.compile(r"\bAIza[0-9A-Za-z_-]{30,}"),
+]
+
+# attributes every LogRecord has, anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+def redact(text: str) -> str:
+    for name in SECRET_ENV_VARS:
+        value = os.getenv(name)
+        if value and len(value) >= 8:
+            text = text.replace(value, f"[{name}]")
+    for pattern in SECRET_PATTERNS:
+        text = pattern.sub("[REDACTED]", text)
+    return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with secrets redacted."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return redact(json.dumps(entry, default=str))
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread instead of the caller."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+class SamplingFilter(logging.Filter):
+    """Lets through every WARNING and above, and `rate` of everything else."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+def sampled_logger(name: str) -> logging.Logger:
+    """Logger for per-message events, sampled by LOG_SAMPLE_RATE."""
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, SamplingFilter) for f in logger.filters):
+        logger.addFilter(SamplingFilter(float(os.getenv("LOG_SAMPLE_RATE", "0.01"))))
+    return logger
+
+
+def setup_logging():
+    """Routes all logging through a background writer. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
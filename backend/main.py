@@ -1,31 +1,77 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query, Response
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi_socketio import SocketManager
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.requests import Request
-from authlib.integrations.starlette_client import OAuth
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 import jwt
 import uuid
+from sqlalchemy import insert
 from dotenv import load_dotenv
-from database import SessionLocal
-from models import User, Task
-import openai
-import google.generativeai as genai
+from database import SessionLocal, AsyncSessionLocal, async_engine
+from models import User, Task, TaskTombstone, TAG_IDS, TAG_NAMES
+import task_queries
+from connections import ClientConnection, ConnectionRegistry
+from event_bus import create_event_bus
+from ws_schemas import parse_client_message, validation_errors, TaskIn, TaskListQuery, TaskUpdate, TaskOut, TaskPage
+from serialization import dumps
+from compression import compress
+from pydantic import ValidationError
+from log_config import setup_logging, sampled_logger
+from metrics import REGISTRY, Counter, Histogram, GaugeFunc, instrument_engine
+from tag_queue import TaggingQueue
+from rate_limit import RateLimiter
+from auth_tokens import TokenVerifier, TokenUser
+from tag_cache import TagCache, TagFallback, task_cache_key
+from tag_classifier import LocalTagClassifier, canonical_category
+from tag_batcher import TagBatcher
+from group_commit import GroupCommitter
+from tag_clients import TaggingClients, CircuitOpenError, ProviderRateLimitError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from datetime import datetime
+from typing import Annotated
+import hashlib
+import math
 import urllib.parse
 import json
+import asyncio
+import logging
+import time
 
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-# print("OpenAI API Key:", os.getenv("OPENAI_API_KEY"))
-
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-print("GEMINI API Key:", os.getenv("GEMINI_API_KEY"))
-
-app = FastAPI()
+setup_logging()
+
+logger = logging.getLogger(__name__)
+# per-message events, sampled so busy sockets don't flood the log
+message_log = sampled_logger("main.messages")
+
+WS_MESSAGE_SECONDS = Histogram("ws_message_duration_seconds", "Time to handle one WebSocket message", ["action"])
+WS_AUTH_SECONDS = Histogram("ws_auth_duration_seconds", "Token verification time per message")
+TAG_OUTCOMES = Counter("tag_requests_total", "Tagging requests by provider and outcome", ["provider", "outcome"])
+BROADCAST_SECONDS = Histogram("broadcast_duration_seconds", "Time to fan out one task event")
+WS_RATE_LIMITED = Counter("ws_rate_limited_total", "Messages and REST requests rejected by the per-user rate limit", ["budget"])
+TAG_PREFETCH = Counter("tag_prefetch_total", "add_task tags served from a suggest_tag prefetch", ["outcome"])
+BROADCAST_FANOUT = Histogram("broadcast_fanout", "Local sockets reached per task event", buckets=(0, 1, 2, 5, 10, 25, 50, 100))
+
+instrument_engine(async_engine.sync_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await event_bus.start(connections.send_frame_to_user)
+    tag_queue.start()
+    yield
+    await tag_queue.stop()
+    await group_commit.stop()
+    await event_bus.stop()
+    await tag_clients.close()
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +79,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 
@@ -54,61 +101,85 @@ async def add_headers(request, call_next):
 # sio = SocketManager(app=app, mount_location="/socket.io", cors_allowed_origins=["*"], async_mode="asgi")
 sio = SocketManager(app=app, mount_location="/socket.io", cors_allowed_origins=["*"], async_mode="asgi")
 
-active_connections = set()
+connections = ConnectionRegistry()
+event_bus = create_event_bus()
 
-def get_db():
-    db = SessionLocal()
-    try:
+GaugeFunc("ws_active_connections", "Open WebSocket connections on this worker", lambda: len(connections))
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 
-oauth = OAuth()
-oauth.register(
-    name="google",
-    client_id=os.getenv("GOOGLE_CLIENT_ID"),
-    client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-    client_kwargs={"scope": "openid email profile"},
-)
+@lru_cache(maxsize=None)
+def get_oauth():
+    """The Google OAuth client, built on the first login so Authlib isn't imported at startup."""
+    from authlib.integrations.starlette_client import OAuth
 
+    oauth = OAuth()
+    oauth.register(
+        name="google",
+        client_id=os.getenv("GOOGLE_CLIENT_ID"),
+        client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
+        server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+        client_kwargs={"scope": "openid email profile"},
+    )
+    return oauth
 
-def create_jwt(user_id: str):
-    return jwt.encode({"user_id": user_id}, os.getenv("SECRET_KEY"), algorithm="HS256")
 
-# decoding JWT Token
-def get_current_user(token: str, db: Session = Depends(get_db)):
+token_verifier = TokenVerifier.from_env()
+
+def create_jwt(user: User) -> str:
+    return token_verifier.issue(user.id, user.name, user.email)
+
+def authenticate_token(token: str) -> TokenUser:
+    """Resolves a token to its user from the token's own claims, without a users lookup."""
     try:
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
-        user = db.query(User).filter(User.id == payload["user_id"]).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user
-    except Exception as e:
+        return token_verifier.verify(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
-    
-def generate_task_tagsOAI(title: str, description: str):
+
+
+tag_clients = TaggingClients.from_env()
+GaugeFunc("tag_llm_in_flight", "LLM calls currently in flight across providers", lambda: tag_clients.in_flight)
+tag_cache = TagCache.from_env(SessionLocal)
+
+@tag_cache.cached
+async def generate_task_tagsOAI(title: str, description: str):
     prompt = f"Classify this task into one category: Work, Urgent, Personal, Shopping, Travel, Health, Learning, Finance, Others.\n\nTask Title: {title}\nTask Description: {description}\nCategory:"
 
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "system", "content": prompt}],
-            temperature=0.5
-        )
-        return response.choices[0].message.content.strip()
-
-    except openai.RateLimitError:
-        print("⚠ OpenAI API quota exceeded! Returning default tag.")
-        return "Others"
+        content = await tag_clients.openai_chat(prompt, model="gpt-3.5-turbo", temperature=0.5)
+        category = canonical_category(content)
+        if category is None:
+            TAG_OUTCOMES.inc("openai", "invalid")
+            logger.warning("OpenAI returned an unknown category: %r", content)
+            raise TagFallback("Others")
+        TAG_OUTCOMES.inc("openai", "success")
+        return category
+
+    except ProviderRateLimitError:
+        TAG_OUTCOMES.inc("openai", "rate_limited")
+        logger.warning("OpenAI API quota exceeded, returning default tag")
+        raise TagFallback("Others")
+
+    except TagFallback:
+        raise
+
+    except CircuitOpenError:
+        TAG_OUTCOMES.inc("openai", "circuit_open")
+        raise TagFallback("Others")
 
     except Exception as e:
-        print(f"⚠ OpenAI API Error: {e}")
-        return "Unknown"
-    
-def generate_task_tagsGAI(title: str, description: str) -> str:
+        TAG_OUTCOMES.inc("openai", "fallback")
+        logger.warning("OpenAI API error: %s", e)
+        raise TagFallback("Others")
+
+@tag_cache.cached
+async def generate_task_tagsGAI(title: str, description: str) -> str:
     """
     Uses Google Gemini AI to generate a single-word task tag based on task title and description.
     Returns only the first relevant tag as a string.
@@ -116,42 +187,374 @@ def generate_task_tagsGAI(title: str, description: str) -> str:
     try:
         prompt = f"Generate ONE single-word category for this task from the following: Work, Urgent, Personal, Shopping, Travel, Health, Learning, Finance, Others.\n\nTitle: {title}\nDescription: {description}\nCategory:"
 
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
+        text = await tag_clients.gemini_generate(prompt)
 
-        print("Gemini AI response:", response.text)
+        logger.debug("Gemini AI response: %s", text)
 
-        tags = response.text.strip().split(",") 
-        selected_tag = tags[0].strip() if tags else "Others"
+        tags = text.strip().split(",")
+        selected_tag = canonical_category(tags[0])
+        if selected_tag is None:
+            TAG_OUTCOMES.inc("gemini", "invalid")
+            logger.warning("Gemini returned an unknown category: %r", text)
+            raise TagFallback("Others")
 
+        TAG_OUTCOMES.inc("gemini", "success")
         return selected_tag
 
+    except ProviderRateLimitError:
+        TAG_OUTCOMES.inc("gemini", "rate_limited")
+        logger.warning("Gemini API quota exceeded, returning default tag")
+        raise TagFallback("Others")
+
+    except TagFallback:
+        raise
+
+    except CircuitOpenError:
+        TAG_OUTCOMES.inc("gemini", "circuit_open")
+        raise TagFallback("Others")
+
     except Exception as e:
-        print(f"⚠ Gemini API Error: {e}")
-        return "Others"
+        TAG_OUTCOMES.inc("gemini", "fallback")
+        logger.warning("Gemini API error: %s", e)
+        raise TagFallback("Others")
+
+
+async def generate_task_tags_batchGAI(tasks: list) -> list:
+    """
+    Tags several (title, description) pairs with one Gemini call.
+    Raises ValueError if the response isn't a JSON array with one tag per task,
+    and the provider's error if the call fails.
+    """
+    lines = [
+        f"{i}. Title: {title}\n   Description: {description}"
+        for i, (title, description) in enumerate(tasks, start=1)
+    ]
+    prompt = (
+        "Classify each task below into ONE category from the following: Work, Urgent, Personal, Shopping, Travel, Health, Learning, Finance, Others.\n"
+        "Respond with only a JSON array of category strings, one per task, in the same order.\n\n"
+        + "\n".join(lines)
+    )
+
+    try:
+        response_text = await tag_clients.gemini_generate(prompt)
+    except ProviderRateLimitError:
+        TAG_OUTCOMES.inc("gemini_batch", "rate_limited")
+        raise
+    except Exception:
+        TAG_OUTCOMES.inc("gemini_batch", "fallback")
+        raise
+
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        tags = json.loads(text)
+    except json.JSONDecodeError:
+        TAG_OUTCOMES.inc("gemini_batch", "malformed")
+        raise
+    if not isinstance(tags, list) or len(tags) != len(tasks):
+        TAG_OUTCOMES.inc("gemini_batch", "malformed")
+        raise ValueError(f"Expected {len(tasks)} tags, got: {response_text}")
+    categories = [canonical_category(str(tag)) for tag in tags]
+    if None in categories:
+        TAG_OUTCOMES.inc("gemini_batch", "malformed")
+        raise ValueError(f"Unknown category in: {response_text}")
+    TAG_OUTCOMES.inc("gemini_batch", "success")
+    return categories
+
+
+TASKS_PAGE_SIZE = int(os.getenv("TASKS_PAGE_SIZE", "200"))
+TASKS_PAGE_MAX = int(os.getenv("TASKS_PAGE_MAX", "1000"))
+BULK_MAX = int(os.getenv("BULK_MAX", "500"))
+
+# single-task writes from all sockets, optionally committed together (WRITE_BATCH_WINDOW_MS)
+group_commit = GroupCommitter.from_env(AsyncSessionLocal)
+GaugeFunc("write_batch_pending", "Task writes waiting for the next group commit", lambda: len(group_commit))
+
+
+def task_to_dict(task: Task) -> dict:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "completed": task.completed,
+        "tags": task.tags
+    }
+
+
+async def next_task_version(db: AsyncSession, owner_id: str) -> int:
+    """Bumps and returns the owner's task-set version. Runs inside the caller's transaction."""
+    result = await db.execute(task_queries.bump_task_version(owner_id))
+    return result.scalar_one()
+
+
+async def apply_task_tag(owner_id: str, task_id: str, tag: str):
+    """Stores a background-generated tag and notifies clients."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(task_queries.owned_task(owner_id, task_id))
+        task = result.scalars().first()
+        if not task:
+            # deleted before tagging finished
+            return
+        task.tags = tag
+        task.tag_source = "llm"
+        task.version = await next_task_version(db, owner_id)
+        await db.commit()
+
+    await broadcast_message(owner_id, {"event": "task_tagged", "task_id": task_id, "tags": task.tags})
+
+
+async def keep_provisional_tags(owner_id: str, *task_ids: str):
+    """
+    The LLM won't tag these tasks (it only had a fallback guess, or there was
+    no room to ask it), so their local tags stay. Tells clients not to wait.
+    """
+    await broadcast_message(owner_id, {"event": "tags_final", "task_ids": list(task_ids)})
+
+
+tag_batcher = TagBatcher.from_env(generate_task_tags_batchGAI, generate_task_tagsGAI, cache=tag_cache)
+tag_queue = TaggingQueue.from_env(tag_batcher.tag, apply_task_tag, on_fallback=keep_provisional_tags)
+
+GaugeFunc("tag_queue_pending", "Tasks waiting for background tagging", lambda: len(tag_queue))
+GaugeFunc(
+    "tag_cache_events",
+    "Tag cache hits, misses and evictions since start",
+    lambda: {(k,): v for k, v in tag_cache.stats().items() if k in ("hits", "misses", "persistent_hits", "evictions", "expirations")},
+    ["event"],
+)
+
+# local classifier answers first, the LLM is only asked when it isn't confident enough
+tag_classifier = LocalTagClassifier.load(os.getenv("TAG_MODEL_PATH", "tag_model.json"))
+TAG_LOCAL_THRESHOLD = float(os.getenv("TAG_LOCAL_THRESHOLD", "0.8"))
+
+# per-user budgets: creating tasks can cost an LLM call and always broadcasts, reads are cheap,
+# suggestions arrive while typing and can each start an LLM call
+ACTION_BUDGETS = {"add_task": "expensive", "add_tasks": "expensive", "suggest_tag": "suggest"}
+rate_limiters = {
+    "cheap": RateLimiter.from_env("cheap", rate=20, burst=40),
+    "expensive": RateLimiter.from_env("expensive", rate=0.5, burst=10),
+    "suggest": RateLimiter.from_env("suggest", rate=2, burst=10),
+}
+
+# add_task consumers still waiting on a suggestion, referenced so they aren't garbage collected
+prefetch_waiters = set()
+
+
+async def suggest_tag(connection: ClientConnection, title: str, description: str) -> str:
+    """
+    Tags text the user is still typing and pushes the result to their socket; fills the tag cache too.
+    Raises TagFallback if the LLM couldn't answer, nothing is suggested then.
+    """
+    tag = await tag_batcher.tag(title, description)
+    connection.send({"event": "tag_suggestion", "tags": tag, "source": "llm"})
+    return tag
+
+
+async def apply_prefetched_tag(owner_id: str, task_id: str, title: str, description: str, prefetch: asyncio.Task):
+    """Waits for a suggestion that was still running when add_task arrived, instead of asking the LLM again."""
+    try:
+        tag = await prefetch
+    except TagFallback:
+        # the LLM was just asked and couldn't answer, the local guess stays
+        TAG_PREFETCH.inc("fallback")
+        await keep_provisional_tags(owner_id, task_id)
+        return
+    except asyncio.CancelledError:
+        if not prefetch.cancelled():
+            raise
+        tag = None
+    except Exception as e:
+        logger.warning("Tag suggestion for task %s failed: %s", task_id, e)
+        tag = None
+
+    if tag is None:
+        TAG_PREFETCH.inc("failed")
+        if not tag_queue.submit(owner_id, task_id, title, description):
+            logger.warning("Tagging queue full, task %s keeps provisional tag", task_id)
+            await keep_provisional_tags(owner_id, task_id)
+        return
+    await apply_task_tag(owner_id, task_id, tag)
+
+
+def rate_limited(user_id: str, action: str, cost: float = 1) -> float:
+    """
+    Charges `cost` tokens of the action's budget to the user. Returns 0, or the seconds
+    to wait if it's over. A cost above the bucket size needs a full bucket and is then
+    charged in full, so the user waits it off before the next expensive action.
+    """
+    budget = ACTION_BUDGETS.get(action, "cheap")
+    retry_after = rate_limiters[budget].acquire(user_id, cost)
+    if retry_after:
+        WS_RATE_LIMITED.inc(budget)
+        message_log.info("Rate limited %s from user %s", action, user_id)
+    return retry_after
+
+
+# task operations shared by the socket actions and the REST endpoints
+
+async def list_tasks(db: AsyncSession, owner_id: str, query: TaskListQuery) -> dict:
+    """One page of the owner's tasks, filtered as the query asks."""
+    limit = min(query.limit or TASKS_PAGE_SIZE, TASKS_PAGE_MAX)
+
+    # read the version first so a later sync_tasks from it can't miss a concurrent change
+    version = await db.scalar(task_queries.user_task_version(owner_id))
+
+    # plain column rows, no ORM objects to build and track
+    result = await db.execute(task_queries.task_page(
+        owner_id, query.cursor, limit,
+        tag=query.tag, completed=query.completed, search=query.search
+    ))
+    rows = result.all()
+
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return {
+        "tasks": [row._asdict() for row in rows[:limit]],
+        "cursor": query.cursor,
+        "next_cursor": next_cursor,
+        "filters": {"tag": query.tag, "completed": query.completed, "search": query.search},
+        "version": version
+    }
+
+
+async def create_task(owner_id: str, task: TaskIn, prefetch: asyncio.Task = None) -> dict:
+    """
+    Stores a new task and broadcasts it. The tag comes from the local classifier,
+    a finished suggestion or the tag cache; failing those the task is broadcast
+    with a provisional tag and again once `prefetch` or the tagging queue answers.
+    """
+    key = task_cache_key(task.title, task.description)
+    local_tag, confidence = tag_classifier.classify(task.title, task.description)
+    needs_llm = confidence < TAG_LOCAL_THRESHOLD
+    tag_source = "provisional" if needs_llm else "local"
+    if needs_llm and prefetch is not None and prefetch.done():
+        if prefetch.cancelled():
+            pass
+        elif isinstance(prefetch.exception(), TagFallback):
+            # the LLM couldn't answer a moment ago, keep the local guess
+            TAG_PREFETCH.inc("fallback")
+            needs_llm = False
+        elif prefetch.exception() is None:
+            TAG_PREFETCH.inc("hit")
+            local_tag, tag_source, needs_llm = prefetch.result(), "llm", False
+        prefetch = None
+    if needs_llm and prefetch is None:
+        # a suggestion from an earlier socket, or the same text tagged before
+        cached_tag = await tag_cache.aget(key)
+        if cached_tag is not None:
+            TAG_PREFETCH.inc("cache")
+            local_tag, tag_source, needs_llm = cached_tag, "llm", False
+    task_id = str(uuid.uuid4())
+
+    async def insert_task(db):
+        # low-confidence tags are provisional until the LLM answers in the background
+        task_obj = Task(
+            id=task_id,
+            title=task.title,
+            description=task.description,
+            completed=False,
+            owner_id=owner_id,
+            tags=local_tag,
+            tag_source=tag_source,
+            version=await next_task_version(db, owner_id)
+        )
+        db.add(task_obj)
+        return task_obj
+
+    # every column is set here, so there's nothing to refresh after the commit
+    task_obj = await group_commit.run(insert_task)
+
+    task_data = {
+        "id": task_obj.id,
+        "title": task_obj.title,
+        "description": task_obj.description,
+        "completed": task_obj.completed,
+        "owner_id": task_obj.owner_id,
+        "tags": task_obj.tags
+    }
+
+    await broadcast_message(owner_id, {"event": "task_created", "task": task_data})
+
+    if needs_llm and prefetch is not None:
+        TAG_PREFETCH.inc("pending")
+        waiter = asyncio.create_task(apply_prefetched_tag(owner_id, task_obj.id, task_obj.title, task_obj.description, prefetch))
+        prefetch_waiters.add(waiter)
+        waiter.add_done_callback(prefetch_waiters.discard)
+    elif needs_llm and not tag_queue.submit(owner_id, task_obj.id, task_obj.title, task_obj.description):
+        logger.warning("Tagging queue full, task %s keeps provisional tag", task_obj.id)
+        await keep_provisional_tags(owner_id, task_obj.id)
+
+    return task_data
+
+
+async def delete_task(owner_id: str, task_id: str) -> bool:
+    """Deletes one task, leaving a tombstone for sync_tasks, and broadcasts it. False if there's no such task."""
+    async def delete_owned(db):
+        result = await db.execute(task_queries.owned_task(owner_id, task_id))
+        task = result.scalars().first()
+        if not task:
+            return False
+        db.add(TaskTombstone(
+            task_id=task.id,
+            owner_id=owner_id,
+            version=await next_task_version(db, owner_id)
+        ))
+        await db.delete(task)
+        return True
+
+    if not await group_commit.run(delete_owned):
+        return False
+    await broadcast_message(owner_id, {"event": "task_deleted", "task_id": task_id})
+    return True
+
+
+async def complete_tasks(db: AsyncSession, owner_id: str, task_ids: list, completed: bool) -> list:
+    """Marks the owner's tasks (not) completed in one transaction and broadcasts it. Returns the ids it found."""
+    version = await next_task_version(db, owner_id)
+    result = await db.execute(task_queries.set_owned_tasks_completed(owner_id, task_ids, completed, version))
+    updated_ids = list(result.scalars())
+    if updated_ids:
+        await db.commit()
+        await broadcast_message(owner_id, {"event": "tasks_completed", "task_ids": updated_ids, "completed": completed})
+    else:
+        await db.rollback()
+    return updated_ids
     
     
 @app.get("/")
 async def home():
     return {"message": "Welcome to TaskManager-AI"}
 
+@app.get("/tag-cache/stats")
+async def tag_cache_stats():
+    return tag_cache.stats()
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/tag-clients/stats")
+async def tag_clients_stats():
+    return tag_clients.stats()
+
 @app.get("/auth/login")
 async def login(request: Request):
     request.session.clear()
-    return await oauth.google.authorize_redirect(
+    return await get_oauth().google.authorize_redirect(
         request,
         redirect_uri=os.getenv("GOOGLE_REDIRECT_URI", "http://ami.polotrax.com/auth/callback"),
         prompt="select_account",
     )
 
 @app.get("/auth/callback")
-async def auth_callback(request: Request, db: Session = Depends(get_db)):
+async def auth_callback(request: Request, db: AsyncSession = Depends(get_db)):
     try:
+        oauth = get_oauth()
         token = await oauth.google.authorize_access_token(request)
         user_info = await oauth.google.get("https://www.googleapis.com/oauth2/v3/userinfo", token=token)
         user_data = user_info.json()
 
-        user = db.query(User).filter(User.email == user_data["email"]).first()
+        result = await db.execute(task_queries.user_by_email(user_data["email"]))
+        user = result.scalars().first()
 
         if not user:
             new_user = User(
@@ -161,11 +564,11 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
                 picture=user_data["picture"],
             )
             db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
+            await db.commit()
+            await db.refresh(new_user)
             user = new_user
 
-        jwt_token = create_jwt(user.id)
+        jwt_token = create_jwt(user)
 
         user_info_encoded = urllib.parse.quote(json.dumps({
             "id": user.id,
@@ -181,107 +584,367 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
         return JSONResponse(content={"error": str(e)}, status_code=400)
 
 
+# REST API for tasks: same operations and payloads as the socket actions, for plain HTTP clients and caches
+
+bearer_auth = HTTPBearer(auto_error=False)
+
+async def rest_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_auth)) -> TokenUser:
+    """
+    The user an `Authorization: Bearer <token>` header belongs to. Async so
+    it runs on the event loop like the socket does: the verifier's cache
+    isn't thread-safe, and a sync dependency would run in the threadpool.
+    """
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="No token provided", headers={"WWW-Authenticate": "Bearer"})
+    return authenticate_token(credentials.credentials)
+
+
+def check_rate_limit(user: TokenUser, action: str):
+    retry_after = rate_limited(user.id, action)
+    if retry_after:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers={"Retry-After": str(math.ceil(retry_after))})
+
+
+def json_response(request: Request, payload, status_code: int = 200, headers: dict = None) -> Response:
+    """Encodes like socket frames do, compressed when the client accepts it."""
+    body, encoding = compress(dumps(payload), request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding", **(headers or {})}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def task_list_etag(owner_id: str, version: int, query: TaskListQuery) -> str:
+    """Changes whenever the owner's tasks or the query do. Weak, since the encoding varies."""
+    digest = hashlib.sha1(f"{owner_id}|{query.model_dump_json()}".encode()).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+@app.get("/tasks", response_model=TaskPage, responses={304: {"description": "Not modified since the ETag in If-None-Match"}})
+async def rest_list_tasks(
+    request: Request,
+    query: Annotated[TaskListQuery, Query()],
+    user: TokenUser = Depends(rest_user),
+    db: AsyncSession = Depends(get_db),
+):
+    check_rate_limit(user, "get_tasks")
+
+    # the task-set version alone decides a 304, no task rows are read for it
+    version = await db.scalar(task_queries.user_task_version(user.id))
+    etag = task_list_etag(user.id, version, query)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+    page = await list_tasks(db, user.id, query)
+    # list_tasks reads the version again, a write may have landed in between
+    etag = task_list_etag(user.id, page["version"], query)
+    return json_response(request, page, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+@app.get("/tasks/{task_id}", response_model=TaskOut)
+async def rest_get_task(task_id: str, request: Request, user: TokenUser = Depends(rest_user), db: AsyncSession = Depends(get_db)):
+    check_rate_limit(user, "get_task")
+    result = await db.execute(task_queries.owned_task(user.id, task_id))
+    task = result.scalars().first()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return json_response(request, task_to_dict(task))
+
+
+@app.post("/tasks", status_code=201, response_model=TaskOut)
+async def rest_create_task(task: TaskIn, request: Request, user: TokenUser = Depends(rest_user)):
+    check_rate_limit(user, "add_task")
+    task_data = await create_task(user.id, task)
+    return json_response(request, task_data, status_code=201)
+
+
+@app.patch("/tasks/{task_id}", response_model=TaskOut)
+async def rest_update_task(task_id: str, update: TaskUpdate, request: Request, user: TokenUser = Depends(rest_user), db: AsyncSession = Depends(get_db)):
+    check_rate_limit(user, "complete_tasks")
+    if not await complete_tasks(db, user.id, [task_id], update.completed):
+        raise HTTPException(status_code=404, detail="Task not found")
+    result = await db.execute(task_queries.owned_task(user.id, task_id))
+    return json_response(request, task_to_dict(result.scalars().one()))
+
+
+@app.delete("/tasks/{task_id}", status_code=204)
+async def rest_delete_task(task_id: str, user: TokenUser = Depends(rest_user)):
+    check_rate_limit(user, "delete_task")
+    if not await delete_task(user.id, task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    return Response(status_code=204)
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Handles WebSocket connections for task management."""
     await websocket.accept()
-    active_connections.add(websocket)
-    print(f"🔗 Client connected: {websocket.client}")
+    connection = ClientConnection.from_env(websocket)
+    connection.start()
+    logger.info("Client connected: %s", websocket.client)
+
+    # resolved once per token and reused for every message on this socket
+    user = None
+    user_token = None
+    # (cache key, asyncio.Task) for the suggest_tag still running, cancelled once the text changes
+    suggestion = None
 
     try:
-        while True:
-            # Receive the message from the client
-            data = await websocket.receive_text()
-            print(f"Received WebSocket message: {data}")
-
-            message = json.loads(data)
-            action = message.get("action")
-            token = message.get("token")
-            
-            if not token:
-                print("⚠ No token received. Closing connection.")
-                await websocket.send_text(json.dumps({"error": "No token provided"}))
-                await websocket.close()
+        while not connection.closed:
+            # Receive the message from the client, text or binary
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            data = frame.get("text") or frame.get("bytes")
+            message_log.debug("Received WebSocket message: %s", data)
+
+            try:
+                message = parse_client_message(data)
+            except ValidationError as e:
+                connection.send({"error": "Invalid message", "detail": validation_errors(e)})
+                continue
+            action = message.action
+            token = message.token
+
+            if not token and user is None:
+                logger.warning("No token received from %s, closing connection", websocket.client)
+                connection.send({"error": "No token provided"})
+                await connection.close()
+                return
+
+            # checked on every message so a socket can't outlive its token; repeat tokens are a cache hit
+            try:
+                with WS_AUTH_SECONDS.time():
+                    user = authenticate_token(token or user_token)
+            except HTTPException as e:
+                logger.warning("%s from %s, closing connection", e.detail, websocket.client)
+                connection.send({"error": e.detail})
+                await connection.close()
                 return
-            
-            db = SessionLocal()
-            user = get_current_user(token, db)
-
-            # fetch tasks
-            if action == "get_tasks":
-                tasks = db.query(Task).filter(Task.owner_id == user.id).all()
-                tasks_list = [
-                    {
-                        "id": task.id,
-                        "title": task.title,
-                        "description": task.description,
-                        "completed": task.completed,
-                        "tags": task.tags
-                    }
-                    for task in tasks
-                ]
-                print(f"Sending task list: {tasks_list}")
-                await websocket.send_text(json.dumps({"event": "task_list", "tasks": tasks_list}))
-
-            elif action == "add_task":
-                task = message.get("task")
-                # generate tag via Gemini AI
-                print("Generating task tag with Gemini AI...")
-                selected_tag = generate_task_tagsGAI(task["title"], task["description"])
-                print(f"Selected Tag: {selected_tag}")
-                task_obj = Task(
-                    id=str(uuid.uuid4()),
-                    title=task["title"],
-                    description=task["description"],
-                    completed=False,
-                    owner_id=user.id,
-                    tags=selected_tag
-                )
-                db.add(task_obj)
-                db.commit()
-                db.refresh(task_obj)
-
-                task_data = {
-                    "id": task_obj.id,
-                    "title": task_obj.title,
-                    "description": task_obj.description,
-                    "completed": task_obj.completed,
-                    "owner_id": task_obj.owner_id,
-                    "tags": task_obj.tags
-                }
-
-                print(f"Broadcasting new task: {task_data}")
-                await broadcast_message({"event": "task_created", "task": task_data})
-
-            elif action == "delete_task":
-                task_id = message.get("task_id")
-                task = db.query(Task).filter(Task.id == task_id, Task.owner_id == user.id).first()
-
-                if task:
-                    db.delete(task)
-                    db.commit()
-                    print(f"Broadcasting task deleted: {task_id}")
-                    await broadcast_message({"event": "task_deleted", "task_id": task_id})
-                else:
-                    print(f"⚠ Task {task_id} not found")
-                    await websocket.send_text(json.dumps({"error": "Task not found"}))
-
-            db.close()
+            if token and token != user_token:
+                user_token = token
+                connections.register(user.id, connection)
+
+            # checked before charging, a rejected batch shouldn't cost anything
+            if action == "add_tasks" and len(message.tasks) > BULK_MAX:
+                connection.send({"error": f"At most {BULK_MAX} tasks per batch"})
+                continue
+
+            # a bulk add can send every one of its tasks to the LLM, so each one counts
+            cost = max(len(message.tasks), 1) if action == "add_tasks" else 1
+            retry_after = rate_limited(user.id, action, cost)
+            if retry_after:
+                connection.send({"error": "Rate limit exceeded", "action": action, "retry_after": round(retry_after, 2)})
+                continue
+
+            with WS_MESSAGE_SECONDS.time(action):
+                async with AsyncSessionLocal() as db:
+                    # fetch tasks
+                    if action == "get_tasks":
+                        page = await list_tasks(db, user.id, message)
+                        message_log.debug("Sending task list page: %d tasks, next cursor %s", len(page["tasks"]), page["next_cursor"])
+                        connection.send({"event": "task_list", **page})
+
+                    # counts per tag and per completion state, so clients don't need every task for them
+                    elif action == "task_stats":
+                        by_tag = {}
+                        by_completion = {"completed": 0, "open": 0}
+                        for tag_id, completed, count in await db.execute(task_queries.task_counts(user.id)):
+                            tag = TAG_NAMES[tag_id]
+                            by_tag[tag] = by_tag.get(tag, 0) + count
+                            by_completion["completed" if completed else "open"] += count
+
+                        connection.send({
+                            "event": "task_stats",
+                            "total": sum(by_completion.values()),
+                            "by_tag": by_tag,
+                            "by_completion": by_completion
+                        })
+
+                    # full detail of one task, listings only carry a summary of the description
+                    elif action == "get_task":
+                        result = await db.execute(task_queries.owned_task(user.id, message.task_id))
+                        task = result.scalars().first()
+                        if task:
+                            connection.send({"event": "task_detail", "task": task_to_dict(task)})
+                        else:
+                            connection.send({"error": "Task not found", "task_id": message.task_id})
+
+                    # changes since the client's last known version (or timestamp)
+                    elif action == "sync_tasks":
+                        since_version = message.since_version
+                        since = message.since
+                        limit = min(message.limit or TASKS_PAGE_SIZE, TASKS_PAGE_MAX)
+                        cursor = message.cursor
+
+                        version = await db.scalar(task_queries.user_task_version(user.id))
+
+                        changed = (await db.execute(task_queries.changed_tasks(user.id, since_version, since, cursor, limit))).all()
+                        deleted = (await db.execute(task_queries.deleted_task_ids(user.id, since_version, since, cursor, limit))).scalars().all()
+
+                        # both lists are in task id order; the page ends where the shorter one runs out
+                        next_cursor = min(
+                            [ids[limit - 1] for ids in ([row.id for row in changed], deleted) if len(ids) > limit],
+                            default=None
+                        )
+                        if next_cursor is not None:
+                            changed = [row for row in changed if row.id <= next_cursor]
+                            deleted = [task_id for task_id in deleted if task_id <= next_cursor]
+
+                        connection.send({
+                            "event": "task_sync",
+                            "tasks": [row._asdict() for row in changed],
+                            "deleted": deleted,
+                            "cursor": cursor,
+                            "next_cursor": next_cursor,
+                            "version": version
+                        })
+
+                    elif action == "suggest_tag":
+                        task = message.task
+                        key = task_cache_key(task.title, task.description)
+                        if suggestion is not None and suggestion[0] == key and not suggestion[1].done():
+                            # same text again, the running suggestion will answer
+                            continue
+                        if suggestion is not None:
+                            suggestion[1].cancel()
+                            suggestion = None
+
+                        local_tag, confidence = tag_classifier.classify(task.title, task.description)
+                        if confidence >= TAG_LOCAL_THRESHOLD:
+                            connection.send({"event": "tag_suggestion", "tags": local_tag, "source": "local"})
+                            continue
+                        cached_tag = await tag_cache.aget(key)
+                        if cached_tag is not None:
+                            connection.send({"event": "tag_suggestion", "tags": cached_tag, "source": "cache"})
+                            continue
+                        suggestion = (key, asyncio.create_task(suggest_tag(connection, task.title, task.description)))
+                        # a failed suggestion only matters to an add_task that consumes it
+                        suggestion[1].add_done_callback(lambda t: t.cancelled() or t.exception())
+
+                    elif action == "add_task":
+                        task = message.task
+                        key = task_cache_key(task.title, task.description)
+                        prefetch = None
+                        if suggestion is not None:
+                            if suggestion[0] == key:
+                                prefetch = suggestion[1]
+                            else:
+                                # a suggestion for text the user has moved on from
+                                suggestion[1].cancel()
+                            suggestion = None
+                        await create_task(user.id, task, prefetch)
+
+                    elif action == "delete_task":
+                        task_id = message.task_id
+                        if not await delete_task(user.id, task_id):
+                            message_log.info("Task %s not found", task_id)
+                            connection.send({"error": "Task not found"})
+
+                    # bulk actions: one transaction, one version bump and one broadcast per batch
+                    elif action == "add_tasks":
+                        tasks = message.tasks
+                        if not tasks:
+                            continue
+
+                        version = await next_task_version(db, user.id)
+                        rows = []
+                        needs_llm = []
+                        for task in tasks:
+                            local_tag, confidence = tag_classifier.classify(task.title, task.description)
+                            row = {
+                                "id": str(uuid.uuid4()),
+                                "title": task.title,
+                                "description": task.description,
+                                "completed": False,
+                                "owner_id": user.id,
+                                "tag_id": TAG_IDS[local_tag],
+                                "tag_source": "local" if confidence >= TAG_LOCAL_THRESHOLD else "provisional",
+                                "version": version,
+                                "updated_at": datetime.utcnow()
+                            }
+                            rows.append(row)
+                            if confidence < TAG_LOCAL_THRESHOLD:
+                                needs_llm.append(row)
+
+                        await db.execute(insert(Task), rows)
+                        await db.commit()
+
+                        tasks_data = [
+                            {
+                                **{key: row[key] for key in ("id", "title", "description", "completed", "owner_id")},
+                                "tags": TAG_NAMES[row["tag_id"]]
+                            }
+                            for row in rows
+                        ]
+                        await broadcast_message(user.id, {"event": "tasks_created", "tasks": tasks_data})
+
+                        # queued together so the batcher can tag them in as few prompts as possible;
+                        # past the user's share of the queue they wait in its overflow
+                        rejected = [
+                            row["id"] for row in needs_llm
+                            if not tag_queue.submit(user.id, row["id"], row["title"], row["description"])
+                        ]
+                        if rejected:
+                            logger.warning("Tagging queue full, %d of %d tasks keep provisional tags", len(rejected), len(rows))
+                            await keep_provisional_tags(user.id, *rejected)
+
+                    elif action == "delete_tasks":
+                        task_ids = message.task_ids
+                        if len(task_ids) > BULK_MAX:
+                            connection.send({"error": f"At most {BULK_MAX} tasks per batch"})
+                            continue
+
+                        version = await next_task_version(db, user.id)
+                        result = await db.execute(task_queries.delete_owned_tasks(user.id, task_ids))
+                        deleted_ids = list(result.scalars())
+                        if deleted_ids:
+                            now = datetime.utcnow()
+                            await db.execute(insert(TaskTombstone), [
+                                {"task_id": task_id, "owner_id": user.id, "version": version, "deleted_at": now}
+                                for task_id in deleted_ids
+                            ])
+                            await db.commit()
+                            await broadcast_message(user.id, {"event": "tasks_deleted", "task_ids": deleted_ids})
+                        else:
+                            await db.rollback()
+
+                        missing = sorted(set(task_ids) - set(deleted_ids))
+                        if missing:
+                            connection.send({"error": "Tasks not found", "task_ids": missing})
+
+                    elif action == "complete_tasks":
+                        task_ids = message.task_ids
+                        completed = message.completed
+                        if len(task_ids) > BULK_MAX:
+                            connection.send({"error": f"At most {BULK_MAX} tasks per batch"})
+                            continue
+
+                        updated_ids = await complete_tasks(db, user.id, task_ids, completed)
+                        missing = sorted(set(task_ids) - set(updated_ids))
+                        if missing:
+                            connection.send({"error": "Tasks not found", "task_ids": missing})
 
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
-        print(f"Client disconnected: {websocket.client}")
-
-
-async def broadcast_message(message: dict):
-    """Sends a message to all connected WebSocket clients."""
-    print(f"Broadcasting message to {len(active_connections)} clients: {message}")
-    disconnected_clients = []
-    for connection in active_connections:
-        try:
-            await connection.send_text(json.dumps(message))
-        except:
-            disconnected_clients.append(connection)
-    
-    for connection in disconnected_clients:
-        active_connections.remove(connection)
+        logger.info("Client disconnected: %s", websocket.client)
+    finally:
+        if suggestion is not None:
+            suggestion[1].cancel()
+        connection.stop()
+        connections.unregister(connection)
+
+
+async def broadcast_message(owner_id: str, message: dict):
+    """Sends a message to every WebSocket the task owner has open, on any worker."""
+    start = time.perf_counter()
+    delivered = await event_bus.publish(owner_id, message)
+    BROADCAST_SECONDS.observe(time.perf_counter() - start)
+    BROADCAST_FANOUT.observe(delivered)
+    message_log.debug("Broadcast %s to %d of the owner's clients on this worker", message.get("event"), delivered)
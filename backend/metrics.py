@@ -0,0 +1,174 @@
+"""
+Minimal Prometheus-style metrics: counters, histograms and scrape-time gauges,
+rendered in the text exposition format at /metrics.
+Recording is a dict lookup and a few additions; nothing is computed until a scrape.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds) with approximate percentiles."""
+
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, p: float):
+        """Upper bound of the bucket holding the p-th percentile, or None with no samples."""
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        REGISTRY.register(self)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+    def samples(self):
+        return iter(())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values = {}
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        for labelvalues, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {value}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LatencyHistogram.BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        self._series = {}
+
+    def labels(self, *labelvalues) -> LatencyHistogram:
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = LatencyHistogram(self.buckets)
+        return series
+
+    def observe(self, value: float, *labelvalues):
+        self.labels(*labelvalues).observe(value)
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.labels(*labelvalues).observe(time.perf_counter() - start)
+
+    def samples(self):
+        for labelvalues, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip(list(series.buckets) + ["+Inf"], series.counts):
+                cumulative += n
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {series.total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labelvalues)} {series.count}"
+
+
+class GaugeFunc(Metric):
+    """Gauge whose value(s) are read at scrape time. `fn` returns a number or a {labelvalues: number} dict."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for labelvalues, v in value.items():
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {v}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: Metric):
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Time spent executing SQL statements")
+
+
+def instrument_engine(engine):
+    """Records every statement's execution time on a (sync) SQLAlchemy engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start", None)
+        if start is not None:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start)
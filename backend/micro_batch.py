@@ -0,0 +1,62 @@
+import asyncio
+
+
+class MicroBatch:
+    """
+    Collects items for up to `window` seconds or until `max_batch` are
+    pending, then hands them to `flush(batch)` together. `batch` is a list of
+    (item, future) pairs, and each submitter waits on its future, so `flush`
+    is expected to settle every one of them.
+    """
+
+    def __init__(self, flush, window: float, max_batch: int):
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+
+        self._pending = []
+        self._timer = None
+        self._flushes = set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self.flush_pending()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush_pending)
+
+        return await future
+
+    def flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        flush = asyncio.create_task(self.flush(batch))
+        # keep a reference so the task isn't garbage collected mid-flight
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
+
+    async def stop(self):
+        """Flushes whatever is pending and waits for flushes in progress."""
+        self.flush_pending()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+def settle(future: asyncio.Future, result):
+    """Resolves a submitter's future with `result`, raised if it's an exception, unless it was cancelled."""
+    if future.done():
+        return
+    if isinstance(result, BaseException):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, String, Text, Boolean, ForeignKey, ARRAY
+from sqlalchemy import Column, String, Text, Boolean, ForeignKey, ARRAY, DateTime, Integer, SmallInteger, Index, DDL, event, func, insert, literal_column
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from database import Base
+from tag_classifier import TAG_CATEGORIES, canonical_category
 
 class User(Base):
     __tablename__ = "users"
@@ -9,16 +11,114 @@ class User(Base):
     name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
     picture = Column(String)
+    # bumped on every task mutation, stamped onto the changed task or tombstone
+    task_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     tasks = relationship("Task", back_populates="owner")
 
+class Tag(Base):
+    """The canonical task categories. Ids are fixed, so they can be mapped without a query."""
+    __tablename__ = "tags"
+
+    id = Column(SmallInteger, primary_key=True, autoincrement=False)
+    name = Column(String, unique=True, nullable=False)
+
+TAG_IDS = {name: i for i, name in enumerate(TAG_CATEGORIES, start=1)}
+TAG_NAMES = {i: name for name, i in TAG_IDS.items()}
+DEFAULT_TAG_ID = TAG_IDS["Others"]
+
+
+def tag_id_for(tag: str) -> int:
+    """Id of the category a raw tag names, falling back to Others."""
+    return TAG_IDS.get(canonical_category(tag), DEFAULT_TAG_ID)
+
+
+@event.listens_for(Tag.__table__, "after_create")
+def _seed_tags(target, connection, **kw):
+    connection.execute(insert(target), [{"id": i, "name": name} for i, name in TAG_NAMES.items()])
+
 class Task(Base):
     __tablename__ = "tasks"
+    # every query is scoped to one owner, so owner_id leads each index
+    __table_args__ = (
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),
+        Index("ix_tasks_owner_id_completed", "owner_id", "completed"),
+        Index("ix_tasks_owner_id_tag_id", "owner_id", "tag_id"),
+        Index("ix_tasks_owner_id_version", "owner_id", "version"),
+    )
 
-    id = Column(String, primary_key=True, index=True)
-    title = Column(String, index=True)
+    id = Column(String, primary_key=True)
+    title = Column(String)
     description = Column(Text, nullable=True)
     completed = Column(Boolean, default=False)
-    tags = Column(String, default="Others")
+    tag_id = Column(SmallInteger, ForeignKey("tags.id"), nullable=False, default=DEFAULT_TAG_ID, server_default=str(DEFAULT_TAG_ID))
     owner_id = Column(String, ForeignKey("users.id"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    # where the tag came from: "llm", "local" (a confident classifier guess) or
+    # "provisional" (an unconfirmed guess); NULL for tasks tagged before it was recorded
+    tag_source = Column(String(16), nullable=True)
     owner = relationship("User", back_populates="tasks")
+
+    @property
+    def tags(self) -> str:
+        """Category name, which is what clients see as "tags"."""
+        return TAG_NAMES.get(self.tag_id if self.tag_id is not None else DEFAULT_TAG_ID)
+
+    @tags.setter
+    def tags(self, tag: str):
+        self.tag_id = tag_id_for(tag)
+
+TASK_SEARCH_CONFIG = "english"
+
+
+def task_search_document(title, description):
+    """The tsvector Postgres searches. Queries must use this exact expression to hit ix_tasks_search."""
+    return func.to_tsvector(
+        literal_column(f"'{TASK_SEARCH_CONFIG}'"),
+        func.coalesce(title, literal_column("''")) + literal_column("' '") + func.coalesce(description, literal_column("''")),
+    )
+
+
+Index(
+    "ix_tasks_search",
+    task_search_document(Task.title, Task.description),
+    postgresql_using="gin",
+).ddl_if(dialect="postgresql")
+
+# SQLite has no tsvector: an FTS5 table shadows the searchable columns, kept in sync by triggers.
+# Created on every create_all so databases made before it existed get it (and are backfilled) too.
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(task_id UNINDEXED, title, description, tokenize='porter unicode61')",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (task_id, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        DELETE FROM tasks_fts WHERE task_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+        UPDATE tasks_fts SET title = new.title, description = new.description WHERE task_id = old.id;
+    END""",
+    """INSERT INTO tasks_fts (task_id, title, description)
+        SELECT id, title, description FROM tasks WHERE id NOT IN (SELECT task_id FROM tasks_fts)""",
+]
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Base.metadata, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+class TaskTombstone(Base):
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_owner_id_version", "owner_id", "version"),
+    )
+
+    task_id = Column(String, primary_key=True)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class TagCacheEntry(Base):
+    __tablename__ = "tag_cache"
+
+    key = Column(String(64), primary_key=True)
+    tag = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
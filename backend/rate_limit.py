@@ -0,0 +1,56 @@
+import os
+import time
+
+from cachetools import TLRUCache
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by user id. Each bucket holds up to `burst` tokens
+    and refills at `rate` tokens per second. A cost above `burst` is let
+    through from a full bucket and leaves it in debt, so a large batch is
+    paid for in full by waiting before the next one. A bucket that has been
+    idle long enough to refill completely is the same as a fresh one, so
+    entries expire after that long and memory stays bounded by the number
+    of active users. A rate of 0 disables the limiter.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100_000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self._buckets = TLRUCache(maxsize=max_keys, ttu=self._refilled_at, timer=clock)
+
+    def _refilled_at(self, key, bucket, now) -> float:
+        tokens, updated = bucket
+        return updated + (self.burst - tokens) / self.rate if self.rate > 0 else now
+
+    @classmethod
+    def from_env(cls, name: str, rate: float, burst: float):
+        """Reads RATE_LIMIT_<NAME>_RATE and RATE_LIMIT_<NAME>_BURST."""
+        prefix = f"RATE_LIMIT_{name.upper()}"
+        return cls(
+            rate=float(os.getenv(f"{prefix}_RATE", str(rate))),
+            burst=float(os.getenv(f"{prefix}_BURST", str(burst))),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str, cost: float = 1) -> float:
+        """
+        Takes `cost` tokens, going into debt for a cost above `burst`. Returns 0
+        on success, or the seconds to wait before it would succeed.
+        """
+        if not self.enabled:
+            return 0
+        now = self.clock()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        needed = min(cost, self.burst)
+        if tokens < needed:
+            self._buckets[key] = (tokens, now)
+            return (needed - tokens) / self.rate
+        self._buckets[key] = (tokens - cost, now)
+        return 0
@@ -0,0 +1,65 @@
+"""
+JSON encoding for WebSocket frames and event bus payloads.
+
+Uses orjson or msgspec when one is installed and the stdlib otherwise;
+all of them produce the same compact UTF-8 JSON.
+"""
+import json
+from datetime import datetime
+
+try:
+    import orjson
+
+    ENCODER = "orjson"
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+
+        ENCODER = "msgspec"
+        dumps = msgspec.json.Encoder().encode
+        loads = msgspec.json.decode
+    except ImportError:
+        ENCODER = "json"
+
+        def _default(value):
+            if isinstance(value, datetime):
+                return value.isoformat()
+            raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+        _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+
+        def dumps(obj) -> bytes:
+            return _encoder.encode(obj).encode("utf-8")
+
+        loads = json.loads
+
+
+class Frame:
+    """
+    One encoded message. Built once per event and shared by every socket it
+    goes to; the text form for text frames is decoded at most once.
+    """
+
+    __slots__ = ("_data", "_text")
+
+    def __init__(self, data: bytes = None, text: str = None):
+        self._data = data
+        self._text = text
+
+    @classmethod
+    def encode(cls, message) -> "Frame":
+        return cls(data=dumps(message))
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = self._text.encode("utf-8")
+        return self._data
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._data.decode("utf-8")
+        return self._text
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+
+from micro_batch import MicroBatch, settle
+from tag_cache import TagFallback, task_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+class TagBatcher:
+    """
+    Coalesces concurrent tagging requests into one multi-task LLM call.
+    Requests are collected for up to `window` seconds or until `max_batch`
+    are pending, then sent together. If the answer is malformed (the batch
+    tagger raises ValueError), every task in it is tagged with its own
+    single call. If the call itself fails (rate limit, timeout, open
+    circuit), asking again per task would only hit the same provider
+    harder, so every task in it gets TagFallback.
+    """
+
+    def __init__(self, batch_tagger, single_tagger, cache=None, window: float = 0.05, max_batch: int = 20):
+        self.batch_tagger = batch_tagger
+        self.single_tagger = single_tagger
+        self.cache = cache
+        self.window = window
+        self.max_batch = max_batch
+
+        self._batch = MicroBatch(self._flush, window, max_batch)
+
+    @classmethod
+    def from_env(cls, batch_tagger, single_tagger, cache=None):
+        return cls(
+            batch_tagger,
+            single_tagger,
+            cache=cache,
+            window=float(os.getenv("TAG_BATCH_WINDOW_MS", "50")) / 1000,
+            max_batch=int(os.getenv("TAG_BATCH_SIZE", "20")),
+        )
+
+    async def tag(self, title: str, description: str) -> str:
+        if self.max_batch <= 1:
+            return await self.single_tagger(title, description)
+
+        return await self._batch.submit((title, description))
+
+    async def _flush(self, batch):
+        # requests cancelled while waiting (a stale suggestion) aren't sent
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+        try:
+            tags = await self._tag_batch(items)
+        except ValueError as e:
+            logger.warning("Malformed batch answer, tagging %d tasks one by one: %s", len(items), e)
+            tags = await asyncio.gather(
+                *(self.single_tagger(title, description) for title, description in items),
+                return_exceptions=True,
+            )
+        except Exception as e:
+            logger.warning("Batch tagging of %d tasks failed: %s", len(items), e)
+            tags = [TagFallback("Others") for _ in items]
+
+        for (_, future), tag in zip(batch, tags):
+            settle(future, tag)
+
+    async def _tag_batch(self, items):
+        """Serves cache hits and sends the rest as one prompt."""
+        tags = [None] * len(items)
+        keys = [task_cache_key(title, description) for title, description in items]
+        if self.cache is not None:
+            tags = [await self.cache.aget(key) for key in keys]
+
+        misses = [i for i, tag in enumerate(tags) if tag is None]
+        if not misses:
+            return tags
+
+        if len(misses) == 1:
+            i = misses[0]
+            try:
+                tags[i] = await self.single_tagger(*items[i])
+            except Exception as e:
+                # already a single call, retrying it one by one would only ask again
+                tags[i] = e
+            return tags
+
+        results = await self.batch_tagger([items[i] for i in misses])
+        if not isinstance(results, list) or len(results) != len(misses):
+            raise ValueError(f"expected {len(misses)} tags, got {results!r}")
+
+        for i, tag in zip(misses, results):
+            tags[i] = tag
+            if self.cache is not None:
+                await self.cache.aset(keys[i], tag)
+        return tags
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from models import TagCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class TagFallback(Exception):
+    """Raised by a tagger when it could not classify the task. Carries the fallback tag, which is never cached."""
+
+    def __init__(self, tag: str):
+        super().__init__(tag)
+        self.tag = tag
+
+
+def normalize_task_text(title: str, description: str) -> str:
+    title = " ".join((title or "").lower().split())
+    description = " ".join((description or "").lower().split())
+    return f"{title}\n{description}"
+
+
+def task_cache_key(title: str, description: str) -> str:
+    return hashlib.sha256(normalize_task_text(title, description).encode("utf-8")).hexdigest()
+
+
+class TagCache:
+    """
+    Content-addressed cache of generated tags.
+    Keeps an in-process LRU with TTL and, when a session factory is given,
+    falls back to the tag_cache table so restarts don't start cold.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 24 * 3600, session_factory=None, persist_ttl: float = 30 * 24 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self.persist_ttl = persist_ttl
+
+        # key -> (tag, expires_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.persistent_hits = 0
+
+    @classmethod
+    def from_env(cls, session_factory=None):
+        persist = os.getenv("TAG_CACHE_PERSIST", "").lower() in ("1", "true", "yes")
+        return cls(
+            max_size=int(os.getenv("TAG_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("TAG_CACHE_TTL", str(24 * 3600))),
+            session_factory=session_factory if persist else None,
+            persist_ttl=float(os.getenv("TAG_CACHE_PERSIST_TTL", str(30 * 24 * 3600))),
+        )
+
+    def get(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                tag, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return tag
+                del self._entries[key]
+                self.expirations += 1
+
+        tag = self._load(key)
+        with self._lock:
+            if tag is None:
+                self.misses += 1
+                return None
+            self.persistent_hits += 1
+            self._put(key, tag, now)
+        return tag
+
+    def set(self, key: str, tag: str):
+        with self._lock:
+            self._put(key, tag, time.monotonic())
+        self._store(key, tag)
+
+    def _put(self, key: str, tag: str, now: float):
+        self._entries[key] = (tag, now + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str):
+        if self.session_factory is None:
+            return None
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.persist_ttl)
+            row = db.query(TagCacheEntry).filter(TagCacheEntry.key == key, TagCacheEntry.created_at >= cutoff).first()
+            return row.tag if row else None
+        except Exception as e:
+            logger.warning("Tag cache lookup failed: %s", e)
+            return None
+        finally:
+            db.close()
+
+    def _store(self, key: str, tag: str):
+        if self.session_factory is None:
+            return
+        db = self.session_factory()
+        try:
+            db.merge(TagCacheEntry(key=key, tag=tag, created_at=datetime.utcnow()))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Tag cache write failed: %s", e)
+        finally:
+            db.close()
+
+    async def aget(self, key: str):
+        # the persistent tier does blocking DB I/O, keep it off the event loop
+        if self.session_factory is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, tag: str):
+        if self.session_factory is None:
+            return self.set(key, tag)
+        await asyncio.to_thread(self.set, key, tag)
+
+    def cached(self, tagger):
+        """
+        Decorator for async tagger(title, description) functions. TagFallback
+        passes through uncached, so callers can tell a guess from an answer.
+        """
+
+        @functools.wraps(tagger)
+        async def wrapper(title: str, description: str) -> str:
+            key = task_cache_key(title, description)
+            tag = await self.aget(key)
+            if tag is not None:
+                return tag
+            tag = await tagger(title, description)
+            await self.aset(key, tag)
+            return tag
+
+        return wrapper
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "persistent": self.session_factory is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent_hits": self.persistent_hits,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
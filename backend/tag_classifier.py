@@ -0,0 +1,162 @@
+"""
+Local task tagger: TF-IDF features scored against per-category centroids.
+
+Retrain from the tasks table with:
+
+    python tag_classifier.py --output tag_model.json
+"""
+import argparse
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+TAG_CATEGORIES = ["Work", "Urgent", "Personal", "Shopping", "Travel", "Health", "Learning", "Finance", "Others"]
+
+# seed vocabulary so the classifier is usable before it has seen any real tasks
+SEED_KEYWORDS = {
+    "Work": "work meeting standup report client deadline email project presentation review office team sprint deploy manager",
+    "Urgent": "urgent asap immediately emergency critical overdue important today tonight",
+    "Personal": "mom dad family birthday friend home clean laundry gift anniversary wedding party",
+    "Shopping": "buy groceries grocery shop shopping order store purchase milk supermarket amazon",
+    "Travel": "flight hotel trip travel passport visa airport train vacation pack luggage booking",
+    "Health": "doctor dentist gym workout exercise medicine appointment yoga pharmacy run health",
+    "Learning": "learn study course exam tutorial practice homework lecture lesson read class",
+    "Finance": "pay rent bill tax taxes bank invoice budget salary insurance loan payment",
+}
+
+STOPWORDS = {"a", "an", "and", "the", "to", "of", "for", "in", "on", "at", "my", "with", "is", "it", "be", "or"}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str):
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def canonical_category(tag: str):
+    """Maps raw LLM output such as "Work." or "**Personal**" to a category name, or None."""
+    cleaned = re.sub(r"[^a-z]", "", (tag or "").lower())
+    for category in TAG_CATEGORIES:
+        if cleaned == category.lower():
+            return category
+    return None
+
+
+def _normalize(vec: dict) -> dict:
+    norm = math.sqrt(sum(w * w for w in vec.values()))
+    if not norm:
+        return vec
+    return {t: w / norm for t, w in vec.items()}
+
+
+class LocalTagClassifier:
+    """
+    Nearest-centroid linear classifier over TF-IDF vectors.
+    classify() returns (tag, confidence) without any network calls.
+    """
+
+    def __init__(self, idf: dict, centroids: dict, temperature: float = 10.0):
+        self.idf = idf
+        self.centroids = centroids
+        self.temperature = temperature
+        self._default_idf = max(idf.values()) if idf else 1.0
+
+    @classmethod
+    def train(cls, samples):
+        """Builds a model from (text, category) pairs plus the seed keywords."""
+        docs = [(tokenize(words), category) for category, words in SEED_KEYWORDS.items()]
+        docs += [(tokenize(text), category) for text, category in samples]
+        docs = [(tokens, category) for tokens, category in docs if tokens]
+
+        df = Counter()
+        for tokens, _ in docs:
+            df.update(set(tokens))
+        idf = {t: math.log((1 + len(docs)) / (1 + n)) + 1 for t, n in df.items()}
+
+        sums = defaultdict(lambda: defaultdict(float))
+        counts = Counter()
+        for tokens, category in docs:
+            tf = Counter(tokens)
+            for t, w in _normalize({t: n * idf[t] for t, n in tf.items()}).items():
+                sums[category][t] += w
+            counts[category] += 1
+
+        centroids = {
+            category: _normalize({t: w / counts[category] for t, w in vec.items()})
+            for category, vec in sums.items()
+        }
+        return cls(idf, centroids)
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads a trained model, or falls back to the seed-only model if the file is missing."""
+        if path and os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            return cls(data["idf"], data["centroids"])
+        return cls.train([])
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"idf": self.idf, "centroids": self.centroids}, f)
+
+    def classify(self, title: str, description: str):
+        tf = Counter(tokenize(f"{title or ''} {description or ''}"))
+        vec = _normalize({t: n * self.idf.get(t, self._default_idf) for t, n in tf.items()})
+
+        scores = {
+            category: sum(w * centroid.get(t, 0.0) for t, w in vec.items())
+            for category, centroid in self.centroids.items()
+        }
+        if not scores or max(scores.values()) <= 0:
+            return "Others", 0.0
+
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        total = sum(math.exp(self.temperature * (s - top)) for s in scores.values())
+        return best, 1.0 / total
+
+
+def load_training_samples(db):
+    """
+    Reads (text, category) pairs from the tasks table, skipping rows tagged Others.
+    Only tags the LLM gave or the classifier was confident about are used, never
+    the provisional guesses left in place when the LLM couldn't answer.
+    """
+    from models import Task, Tag
+
+    samples = []
+    query = (
+        db.query(Task.title, Task.description, Tag.name)
+        .join(Tag, Task.tag_id == Tag.id)
+        .filter(Task.tag_source.in_(("llm", "local")))
+    )
+    for title, description, category in query.yield_per(1000):
+        # "Others" is also what failed LLM calls produce, so it's too noisy to learn from
+        if category != "Others":
+            samples.append((f"{title or ''} {description or ''}", category))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the local task tag classifier from the tasks table.")
+    parser.add_argument("--output", default=os.getenv("TAG_MODEL_PATH", "tag_model.json"))
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        samples = load_training_samples(db)
+    finally:
+        db.close()
+
+    model = LocalTagClassifier.train(samples)
+    model.save(args.output)
+    print(f"Trained on {len(samples)} tasks, model written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
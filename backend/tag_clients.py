@@ -0,0 +1,211 @@
+import asyncio
+import os
+import time
+
+from metrics import Counter, Histogram
+
+PROVIDER_SECONDS = Histogram("tag_provider_request_seconds", "Latency of tagging provider calls", ["provider"])
+PROVIDER_ERRORS = Counter("tag_provider_errors_total", "Failed tagging provider calls", ["provider"])
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class ProviderRateLimitError(Exception):
+    """The provider rejected the call for quota or rate reasons."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        """Frees the half-open trial slot when a call is abandoned without a result."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class TaggingClients:
+    """
+    Long-lived provider clients for the taggers. A provider's SDK is imported
+    and its client built on the first call to it (off the event loop), so
+    workers start without loading SDKs they may never use. Each provider
+    gets a concurrency limit, a per-call timeout, a circuit breaker and a
+    latency histogram. `max_in_flight` caps calls across all providers
+    together, so the shared quota can't be drained by one burst.
+    """
+
+    PROVIDERS = ("gemini", "openai")
+
+    def __init__(self, timeout: float = 15.0, max_concurrency: int = 8, max_connections: int = 20,
+                 keepalive_expiry: float = 60.0, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 max_in_flight: int = 8):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+
+        self.gemini = None
+        self.openai = None
+        self._http = None
+        self._loading = asyncio.Lock()
+
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._in_flight_limit = asyncio.Semaphore(max_in_flight)
+        self._limits = {p: asyncio.Semaphore(max_concurrency) for p in self.PROVIDERS}
+        self.breakers = {p: CircuitBreaker(failure_threshold, reset_timeout) for p in self.PROVIDERS}
+        self.latency = {p: PROVIDER_SECONDS.labels(p) for p in self.PROVIDERS}
+        self.errors = {p: 0 for p in self.PROVIDERS}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            timeout=float(os.getenv("TAG_CLIENT_TIMEOUT", "15")),
+            max_concurrency=int(os.getenv("TAG_CLIENT_CONCURRENCY", "8")),
+            max_connections=int(os.getenv("TAG_CLIENT_MAX_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("TAG_CLIENT_KEEPALIVE", "60")),
+            failure_threshold=int(os.getenv("TAG_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("TAG_BREAKER_RESET", "30")),
+            max_in_flight=int(os.getenv("TAG_LLM_MAX_IN_FLIGHT", "8")),
+        )
+
+    def _load_gemini(self):
+        import google.generativeai as genai
+
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        self.gemini = genai.GenerativeModel("gemini-pro")
+
+    def _load_openai(self):
+        import httpx
+        import openai
+
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+        )
+        self.openai = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=self.timeout,
+            max_retries=0,
+            http_client=self._http,
+        )
+
+    async def _ensure(self, provider: str):
+        if getattr(self, provider) is not None:
+            return
+        async with self._loading:
+            if getattr(self, provider) is None:
+                # SDK imports take hundreds of milliseconds, keep them off the event loop
+                await asyncio.to_thread(getattr(self, f"_load_{provider}"))
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _call(self, provider: str, coro_fn):
+        breaker = self.breakers[provider]
+        if not breaker.allow():
+            raise CircuitOpenError(f"{provider} circuit is open")
+
+        async with self._in_flight_limit, self._limits[provider]:
+            self.in_flight += 1
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(coro_fn(), self.timeout)
+            except asyncio.CancelledError:
+                breaker.release_trial()
+                raise
+            except Exception:
+                self.errors[provider] += 1
+                PROVIDER_ERRORS.inc(provider)
+                breaker.record_failure()
+                raise
+            finally:
+                self.in_flight -= 1
+                self.latency[provider].observe(time.perf_counter() - start)
+        breaker.record_success()
+        return result
+
+    async def gemini_generate(self, prompt: str) -> str:
+        await self._ensure("gemini")
+        from google.api_core.exceptions import ResourceExhausted
+
+        try:
+            response = await self._call(provider="gemini", coro_fn=lambda: self.gemini.generate_content_async(prompt))
+        except ResourceExhausted as e:
+            raise ProviderRateLimitError(str(e)) from e
+        return response.text
+
+    async def openai_chat(self, prompt: str, model: str = "gpt-3.5-turbo", temperature: float = 0.5) -> str:
+        if not os.getenv("OPENAI_API_KEY"):
+            # OpenAI is an optional provider, only Gemini is used by default
+            raise RuntimeError("OPENAI_API_KEY is not set")
+        await self._ensure("openai")
+        import openai
+
+        try:
+            response = await self._call(
+                provider="openai",
+                coro_fn=lambda: self.openai.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "system", "content": prompt}],
+                    temperature=temperature,
+                ),
+            )
+        except openai.RateLimitError as e:
+            raise ProviderRateLimitError(str(e)) from e
+        return response.choices[0].message.content
+
+    def stats(self) -> dict:
+        stats = {
+            provider: {
+                "circuit": self.breakers[provider].state,
+                "errors": self.errors[provider],
+                "latency": self.latency[provider].snapshot(),
+            }
+            for provider in self.PROVIDERS
+        }
+        stats["in_flight"] = self.in_flight
+        stats["max_in_flight"] = self.max_in_flight
+        return stats
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+
+from tag_cache import TagFallback
+
+logger = logging.getLogger(__name__)
+
+
+class TaggingQueue:
+    """
+    Bounded pool of asyncio workers that tags tasks in the background.
+    `tagger` is an async callable; `on_tagged` receives each result, and
+    `on_fallback` is told about tasks the tagger could only guess for
+    (TagFallback), which keep the tag they already have.
+    Pending jobs are kept per user and served round-robin, so one user
+    submitting hundreds of tasks can't starve everyone else.
+
+    Each user has at most `max_per_user` jobs in the rotation, and it holds
+    at most `max_pending`. Jobs past either limit wait in the user's
+    overflow, up to `max_overflow` across all users, and join the rotation
+    as slots free up. They are delayed, not dropped.
+    """
+
+    def __init__(self, tagger, on_tagged, on_fallback=None, workers: int = 16, max_pending: int = 1000, max_per_user: int = 50,
+                 max_overflow: int = 10000):
+        self.tagger = tagger
+        self.on_tagged = on_tagged
+        self.on_fallback = on_fallback
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.max_overflow = max_overflow
+
+        # owner_id -> deque of (task_id, title, description), in round-robin order
+        self._pending = OrderedDict()
+        self._size = 0
+        # owner_id -> deque of jobs waiting for a slot in the rotation, oldest user first
+        self._overflow = OrderedDict()
+        self._overflow_size = 0
+        self._ready = asyncio.Event()
+        self._tasks = []
+
+    @classmethod
+    def from_env(cls, tagger, on_tagged, on_fallback=None):
+        return cls(
+            tagger,
+            on_tagged,
+            on_fallback=on_fallback,
+            workers=int(os.getenv("TAG_WORKERS", "16")),
+            max_pending=int(os.getenv("TAG_QUEUE_MAX_PENDING", "1000")),
+            max_per_user=int(os.getenv("TAG_QUEUE_MAX_PER_USER", "50")),
+            max_overflow=int(os.getenv("TAG_QUEUE_MAX_OVERFLOW", "10000")),
+        )
+
+    def __len__(self):
+        return self._size + self._overflow_size
+
+    def submit(self, owner_id: str, task_id: str, title: str, description: str) -> bool:
+        """Queues a task for tagging. Returns False only if the overflow is full too."""
+        job = (task_id, title, description)
+        if not self._has_slot(owner_id) or owner_id in self._overflow:
+            # behind the user's earlier overflow, so their jobs stay in order
+            if self._overflow_size >= self.max_overflow:
+                return False
+            self._overflow.setdefault(owner_id, deque()).append(job)
+            self._overflow_size += 1
+            return True
+
+        self._enqueue(owner_id, job)
+        return True
+
+    def _has_slot(self, owner_id: str) -> bool:
+        if self._size >= self.max_pending:
+            return False
+        jobs = self._pending.get(owner_id)
+        return jobs is None or len(jobs) < self.max_per_user
+
+    def _enqueue(self, owner_id: str, job):
+        jobs = self._pending.get(owner_id)
+        if jobs is None:
+            jobs = self._pending[owner_id] = deque()
+        jobs.append(job)
+        self._size += 1
+        self._ready.set()
+
+    def _promote(self):
+        """Moves overflow into the rotation while there is room, one job per user per pass."""
+        while self._overflow and self._size < self.max_pending:
+            moved = False
+            for owner_id in list(self._overflow):
+                if not self._has_slot(owner_id):
+                    continue
+                waiting = self._overflow[owner_id]
+                self._enqueue(owner_id, waiting.popleft())
+                self._overflow_size -= 1
+                if not waiting:
+                    del self._overflow[owner_id]
+                moved = True
+            if not moved:
+                return
+
+    def _next_job(self):
+        owner_id, jobs = self._pending.popitem(last=False)
+        job = jobs.popleft()
+        if jobs:
+            # user still has work queued, send them to the back of the line
+            self._pending[owner_id] = jobs
+        self._size -= 1
+        self._promote()
+        if not self._size:
+            self._ready.clear()
+        return owner_id, job
+
+    async def _worker(self):
+        while True:
+            await self._ready.wait()
+            if not self._size:
+                continue
+
+            owner_id, (task_id, title, description) = self._next_job()
+            try:
+                try:
+                    tag = await self.tagger(title, description)
+                except TagFallback:
+                    if self.on_fallback is not None:
+                        await self.on_fallback(owner_id, task_id)
+                    continue
+                await self.on_tagged(owner_id, task_id, tag)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Tagging failed for task %s: %s", task_id, e)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
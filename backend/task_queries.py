@@ -0,0 +1,176 @@
+"""
+Statements issued by the task handlers in main.py.
+Kept in one place so check_indexes.py can EXPLAIN exactly what runs in production.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import Boolean, bindparam, column, delete, func, literal_column, select, table, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from models import User, Task, Tag, TaskTombstone, TAG_IDS, TASK_SEARCH_CONFIG, task_search_document
+
+
+# listings carry the start of the description; get_task fetches the whole row
+TASK_SUMMARY_LENGTH = 140
+
+TASK_LIST_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.completed,
+    Tag.name.label("tags"),
+    func.substr(Task.description, 1, TASK_SUMMARY_LENGTH).label("summary"),
+)
+
+
+def task_list_select():
+    return select(*TASK_LIST_COLUMNS).join(Tag, Task.tag_id == Tag.id)
+
+
+tasks_fts = table("tasks_fts", column("task_id"))
+
+
+def search_words(search: str) -> list:
+    return re.findall(r"\w+", search)
+
+
+def fts_query(search: str) -> str:
+    """Turns free text into an FTS5 query: every word must match, as a prefix, with no operators."""
+    return " ".join(f'"{word}"*' for word in search_words(search))
+
+
+def prefix_tsquery(search: str) -> str:
+    """The same query for Postgres' to_tsquery, so "mil" finds "milk" on both backends."""
+    return " & ".join(f"{word}:*" for word in search_words(search))
+
+
+class TaskSearch(ColumnElement):
+    """
+    WHERE clause for a full-text search over title and description. Compiles
+    to a tsvector match on Postgres and to a tasks_fts lookup elsewhere; on
+    both every word of the search has to start a word of the task.
+    """
+
+    type = Boolean()
+    inherit_cache = True
+    # already a predicate, so SQLite doesn't get an "= 1" tacked on
+    _is_implicitly_boolean = True
+    _traverse_internals = [
+        ("tsquery", InternalTraversal.dp_clauseelement),
+        ("fts", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, search: str):
+        self.tsquery = bindparam("search_tsquery", prefix_tsquery(search), unique=True)
+        self.fts = bindparam("search_fts", fts_query(search), unique=True)
+
+
+@compiles(TaskSearch, "postgresql")
+def _search_postgres(element, compiler, **kw):
+    query = func.to_tsquery(literal_column(f"'{TASK_SEARCH_CONFIG}'"), element.tsquery)
+    return compiler.process(task_search_document(Task.title, Task.description).op("@@")(query), **kw)
+
+
+@compiles(TaskSearch)
+def _search_fts(element, compiler, **kw):
+    matches = select(tasks_fts.c.task_id).where(literal_column("tasks_fts").match(element.fts))
+    return compiler.process(Task.id.in_(matches), **kw)
+
+
+def user_by_id(user_id: str):
+    return select(User).filter(User.id == user_id)
+
+
+def user_by_email(email: str):
+    return select(User).filter(User.email == email)
+
+
+def user_task_version(user_id: str):
+    return select(User.task_version).filter(User.id == user_id)
+
+
+def bump_task_version(user_id: str):
+    return (
+        update(User)
+        .filter(User.id == user_id)
+        .values(task_version=User.task_version + 1)
+        .returning(User.task_version)
+    )
+
+
+def owned_task(owner_id: str, task_id: str):
+    return select(Task).filter(Task.id == task_id, Task.owner_id == owner_id)
+
+
+def task_page(
+    owner_id: str,
+    cursor: str = None,
+    limit: int = 200,
+    tag: str = None,
+    completed: bool = None,
+    search: str = None,
+):
+    """
+    One page of an owner's tasks in id order, as plain rows of TASK_LIST_COLUMNS,
+    optionally narrowed by tag, completion and a full-text search.
+    Fetches limit + 1 rows so the caller can tell if more remain.
+    """
+    query = task_list_select().filter(Task.owner_id == owner_id).order_by(Task.id).limit(limit + 1)
+    if cursor:
+        query = query.filter(Task.id > cursor)
+    if tag is not None:
+        query = query.filter(Task.tag_id == TAG_IDS[tag])
+    if completed is not None:
+        query = query.filter(Task.completed == completed)
+    # text with no words (just punctuation, say) has nothing to match, and FTS5 rejects an empty query
+    if search and fts_query(search):
+        query = query.filter(TaskSearch(search))
+    return query
+
+
+def task_counts(owner_id: str):
+    """Task counts per (tag id, completed) pair, in one GROUP BY."""
+    return (
+        select(Task.tag_id, Task.completed, func.count())
+        .filter(Task.owner_id == owner_id)
+        .group_by(Task.tag_id, Task.completed)
+    )
+
+
+def changed_tasks(owner_id: str, since_version: int = None, since: datetime = None, cursor: str = None, limit: int = 200):
+    """Tasks changed since a version (or time), in id order, paged like task_page."""
+    query = task_list_select().filter(Task.owner_id == owner_id).order_by(Task.id).limit(limit + 1)
+    if cursor:
+        query = query.filter(Task.id > cursor)
+    if since_version is not None:
+        query = query.filter(Task.version > since_version)
+    elif since is not None:
+        query = query.filter(Task.updated_at > since)
+    return query
+
+
+def deleted_task_ids(owner_id: str, since_version: int = None, since: datetime = None, cursor: str = None, limit: int = 200):
+    """Ids of tasks deleted since a version (or time), in id order, paged with the same cursor as changed_tasks."""
+    query = select(TaskTombstone.task_id).filter(TaskTombstone.owner_id == owner_id).order_by(TaskTombstone.task_id).limit(limit + 1)
+    if cursor:
+        query = query.filter(TaskTombstone.task_id > cursor)
+    if since_version is not None:
+        query = query.filter(TaskTombstone.version > since_version)
+    elif since is not None:
+        query = query.filter(TaskTombstone.deleted_at > since)
+    return query
+
+
+def delete_owned_tasks(owner_id: str, task_ids: list):
+    return delete(Task).filter(Task.owner_id == owner_id, Task.id.in_(task_ids)).returning(Task.id)
+
+
+def set_owned_tasks_completed(owner_id: str, task_ids: list, completed: bool, version: int):
+    return (
+        update(Task)
+        .filter(Task.owner_id == owner_id, Task.id.in_(task_ids))
+        .values(completed=completed, version=version, updated_at=datetime.utcnow())
+        .returning(Task.id)
+    )
@@ -0,0 +1,68 @@
+"""
+Runs the app in-process against a throwaway SQLite database, with the LLM
+provider replaced by a fake that answers instantly.
+
+    cd backend && python -m pytest -q tests
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+# read at import time by database.py and main.py
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ai-task-tests-"), "test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+os.environ.setdefault("EVENT_BUS", "memory")
+for budget in ("CHEAP", "EXPENSIVE", "SUGGEST"):
+    os.environ[f"RATE_LIMIT_{budget}_RATE"] = "0"
+
+FAKE_TAG = "Finance"
+
+
+async def fake_gemini(prompt: str) -> str:
+    """Tags everything FAKE_TAG, as a JSON array when the prompt is a batch."""
+    if "JSON array" in prompt:
+        return json.dumps([FAKE_TAG] * len(re.findall(r"^\d+\. Title:", prompt, re.M)))
+    return FAKE_TAG
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+    from database import Base, engine
+
+    Base.metadata.create_all(engine)
+    main.tag_clients.gemini_generate = fake_gemini
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def token(client):
+    """A token for a new user with no tasks."""
+    import main
+    from database import SessionLocal
+    from models import User
+
+    user_id = f"test-{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        db.add(User(id=user_id, name="Test", email=f"{user_id}@test.local"))
+        db.commit()
+    return main.token_verifier.issue(user_id, "Test", f"{user_id}@test.local")
+
+
+@pytest.fixture
+def ws(client, token):
+    """An open socket; send_action(**message) adds the token."""
+    with client.websocket_connect("/ws") as socket:
+        socket.send_action = lambda **message: socket.send_text(json.dumps({"token": token, **message}))
+        yield socket
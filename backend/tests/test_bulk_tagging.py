@@ -0,0 +1,27 @@
+import uuid
+
+import main
+from conftest import FAKE_TAG
+
+
+def test_add_tasks_past_queue_share_tags_every_task(ws, monkeypatch):
+    # nothing is confident locally, so every task goes to the (fake) LLM
+    monkeypatch.setattr(main, "TAG_LOCAL_THRESHOLD", 1.1)
+    count = main.tag_queue.max_per_user + 70
+    run = uuid.uuid4().hex[:8]
+
+    ws.send_action(action="add_tasks", tasks=[{"title": f"Bulk {run} {i}", "description": "imported"} for i in range(count)])
+
+    created = ws.receive_json()
+    assert created["event"] == "tasks_created"
+    ids = {task["id"] for task in created["tasks"]}
+    assert len(ids) == count
+
+    tagged = {}
+    while len(tagged) < count:
+        event = ws.receive_json()
+        assert event["event"] == "task_tagged", event
+        tagged[event["task_id"]] = event["tags"]
+
+    assert set(tagged) == ids
+    assert set(tagged.values()) == {FAKE_TAG}
@@ -0,0 +1,90 @@
+import asyncio
+
+import asyncpg
+
+from event_bus import EventBus, PostgresEventBus
+from serialization import loads
+
+
+class FakeBus(EventBus):
+    """Keeps what it publishes, and fails when told to."""
+    max_payload = 200
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.published = []
+
+    async def _publish(self, payload: bytes):
+        if self.fail:
+            raise ConnectionError("bus is down")
+        self.published.append(payload)
+
+
+def publish(bus, message):
+    delivered = []
+    asyncio.run(bus.start(lambda owner_id, frame: delivered.append(frame) or 1))
+    assert asyncio.run(bus.publish("user-1", message)) == 1
+    return delivered
+
+
+def test_oversize_event_is_published_as_a_resync():
+    bus = FakeBus()
+    # as add_tasks broadcasts a batch
+    message = {"event": "tasks_created", "tasks": [{"id": f"t{i}", "title": "x" * 50, "tags": "Others"} for i in range(10)]}
+
+    delivered = publish(bus, message)
+
+    assert loads(delivered[0].data) == message
+    header, _, body = bus.published[0].partition(b"\n")
+    assert loads(header)[1] == "user-1"
+    assert loads(body) == {"event": "resync", "owner_id": "user-1"}
+
+
+def test_publish_failure_still_delivers_locally():
+    bus = FakeBus(fail=True)
+
+    delivered = publish(bus, {"event": "task_deleted", "task_id": "t1"})
+
+    assert len(delivered) == 1
+
+
+class FakeListener:
+    def __init__(self):
+        self.on_close = None
+
+    def add_termination_listener(self, callback):
+        self.on_close = callback
+
+    async def add_listener(self, channel, callback):
+        pass
+
+    async def close(self):
+        self.on_close(self)
+
+
+def test_postgres_bus_listens_again_after_the_connection_drops(monkeypatch):
+    listeners = []
+
+    async def connect(dsn):
+        if len(listeners) == 1:
+            # the first reconnect attempt fails too
+            listeners.append(None)
+            raise OSError("connection refused")
+        listeners.append(FakeListener())
+        return listeners[-1]
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    monkeypatch.setattr(asyncio, "sleep", lambda delay, real_sleep=asyncio.sleep: real_sleep(0))
+
+    async def run():
+        bus = PostgresEventBus("postgresql+asyncpg://db/tasks")
+        await bus._listen()
+        listeners[0].on_close(listeners[0])
+        await bus._relisten
+        await bus.stop()
+        return bus
+
+    bus = asyncio.run(run())
+    assert len(listeners) == 3
+    assert bus._listener is listeners[2]
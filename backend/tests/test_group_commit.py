@@ -0,0 +1,59 @@
+import asyncio
+
+from group_commit import GroupCommitter
+
+
+class FakeSession:
+    def __init__(self, commits):
+        self.commits = commits
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def flush(self):
+        pass
+
+    async def commit(self):
+        self.commits.append(self)
+
+
+def test_writes_in_one_window_share_a_commit():
+    commits = []
+
+    async def run():
+        committer = GroupCommitter(lambda: FakeSession(commits), window=0.01, max_batch=64)
+
+        async def write(i):
+            return await committer.run(lambda db: asyncio.sleep(0, result=i))
+
+        results = await asyncio.gather(*(write(i) for i in range(5)))
+        await committer.stop()
+        return results
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+    assert len(commits) == 1
+
+
+def test_failed_batch_is_retried_one_write_at_a_time():
+    commits = []
+
+    async def run():
+        committer = GroupCommitter(lambda: FakeSession(commits), window=0.01, max_batch=64)
+        failing = {"first": True}
+
+        async def flaky(db):
+            # fails inside the batch, succeeds when run alone
+            if failing.pop("first", False):
+                raise RuntimeError("constraint violated")
+            return "ok"
+
+        async def fine(db):
+            return "fine"
+
+        return await asyncio.gather(committer.run(flaky), committer.run(fine))
+
+    assert asyncio.run(run()) == ["ok", "fine"]
+    assert len(commits) == 2
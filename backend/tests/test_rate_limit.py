@@ -0,0 +1,51 @@
+import main
+from rate_limit import RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_rate():
+    clock = Clock()
+    limiter = RateLimiter(rate=0.5, burst=10, clock=clock)
+
+    assert all(limiter.acquire("u") == 0 for _ in range(10))
+    assert limiter.acquire("u") == 2
+    clock.now += 2
+    assert limiter.acquire("u") == 0
+
+
+def test_cost_above_burst_is_paid_in_full():
+    clock = Clock()
+    limiter = RateLimiter(rate=0.5, burst=10, clock=clock)
+
+    assert limiter.acquire("u", 500) == 0
+    # 490 tokens in debt, then one more is needed
+    assert limiter.acquire("u") == 982
+    clock.now += 980
+    assert limiter.acquire("u") == 2
+    clock.now += 2
+    assert limiter.acquire("u") == 0
+
+
+def test_debt_outlives_the_refill_time_of_a_full_bucket():
+    clock = Clock()
+    limiter = RateLimiter(rate=0.5, burst=10, clock=clock)
+
+    limiter.acquire("u", 500)
+    clock.now += 25
+    assert limiter.acquire("u") > 0
+
+
+def test_bulk_add_is_charged_per_task(monkeypatch):
+    clock = Clock()
+    monkeypatch.setitem(main.rate_limiters, "expensive", RateLimiter(rate=0.5, burst=10, clock=clock))
+
+    assert main.rate_limited("u", "add_tasks", 500) == 0
+    assert main.rate_limited("u", "add_task") > 0
+    assert main.rate_limited("u", "get_tasks") == 0
@@ -0,0 +1,65 @@
+import asyncio
+
+from tag_batcher import TagBatcher
+from tag_cache import TagFallback
+
+
+class FakeTagger:
+    """Records the prompts it gets and tags every task with its title."""
+
+    def __init__(self):
+        self.batches = []
+        self.singles = []
+
+    async def batch(self, items):
+        self.batches.append(items)
+        return [title for title, _ in items]
+
+    async def single(self, title, description):
+        self.singles.append((title, description))
+        return title
+
+
+def test_cancelled_request_is_not_sent():
+    tagger = FakeTagger()
+
+    async def run():
+        batcher = TagBatcher(tagger.batch, tagger.single, window=0.01)
+        stale = asyncio.create_task(batcher.tag("Draft", ""))
+        kept = [asyncio.create_task(batcher.tag(title, "")) for title in ("Milk", "Rent")]
+        await asyncio.sleep(0)
+        stale.cancel()
+        return await asyncio.gather(*kept)
+
+    assert asyncio.run(run()) == ["Milk", "Rent"]
+    assert tagger.batches == [[("Milk", ""), ("Rent", "")]]
+    assert tagger.singles == []
+
+
+def test_malformed_batch_falls_back_to_single_calls():
+    tagger = FakeTagger()
+
+    async def malformed(items):
+        raise ValueError("not a JSON array")
+
+    async def run():
+        batcher = TagBatcher(malformed, tagger.single, window=0.01)
+        return await asyncio.gather(batcher.tag("Milk", ""), batcher.tag("Rent", ""))
+
+    assert asyncio.run(run()) == ["Milk", "Rent"]
+    assert tagger.singles == [("Milk", ""), ("Rent", "")]
+
+
+def test_provider_error_is_a_fallback_for_every_task():
+    tagger = FakeTagger()
+
+    async def rate_limited(items):
+        raise ConnectionError("429 quota exceeded")
+
+    async def run():
+        batcher = TagBatcher(rate_limited, tagger.single, window=0.01)
+        return await asyncio.gather(batcher.tag("Milk", ""), batcher.tag("Rent", ""), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, TagFallback) for result in results)
+    assert tagger.singles == []
@@ -0,0 +1,19 @@
+import uuid
+
+from database import SessionLocal
+from models import Task
+from tag_classifier import load_training_samples
+
+
+def test_training_skips_unconfirmed_tags(client):
+    run = uuid.uuid4().hex[:8]
+    owner_id = f"test-{run}"
+    with SessionLocal() as db:
+        for source in ("llm", "local", "provisional", None):
+            db.add(Task(id=f"{run}-{source}", title=f"{run} {source}", owner_id=owner_id, tags="Finance", tag_source=source))
+        db.commit()
+
+        texts = {text for text, _ in load_training_samples(db)}
+
+    assert {f"{run} llm ", f"{run} local "} <= texts
+    assert not {f"{run} provisional ", f"{run} None "} & texts
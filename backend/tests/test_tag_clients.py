@@ -0,0 +1,35 @@
+import asyncio
+import uuid
+
+import pytest
+from google.api_core.exceptions import ResourceExhausted
+
+import main
+from tag_cache import TagFallback
+from tag_clients import ProviderRateLimitError, TaggingClients
+
+
+class QuotaExceededModel:
+    async def generate_content_async(self, prompt):
+        raise ResourceExhausted("429 quota exceeded")
+
+
+def test_gemini_quota_error_is_a_rate_limit():
+    clients = TaggingClients()
+    clients.gemini = QuotaExceededModel()
+
+    with pytest.raises(ProviderRateLimitError):
+        asyncio.run(clients.gemini_generate("Milk"))
+
+
+def test_gemini_rate_limit_is_counted_apart_from_other_failures(client, monkeypatch):
+    async def quota_exceeded(prompt):
+        raise ProviderRateLimitError("429 quota exceeded")
+
+    monkeypatch.setattr(main.tag_clients, "gemini_generate", quota_exceeded)
+    before = main.TAG_OUTCOMES._values.get(("gemini", "rate_limited"), 0)
+
+    with pytest.raises(TagFallback):
+        asyncio.run(main.generate_task_tagsGAI(f"Milk {uuid.uuid4().hex[:8]}", ""))
+
+    assert main.TAG_OUTCOMES._values[("gemini", "rate_limited")] == before + 1
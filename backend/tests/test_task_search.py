@@ -0,0 +1,54 @@
+import uuid
+
+
+def add_task(ws, title):
+    ws.send_action(action="add_task", task={"title": title, "description": ""})
+    return ws.receive_json()["task"]["id"]
+
+
+def list_tasks(ws, **filters):
+    ws.send_action(action="get_tasks", **filters)
+    reply = ws.receive_json()
+    assert reply["event"] == "task_list", reply
+    return reply
+
+
+def test_search_matches_words(ws):
+    run = uuid.uuid4().hex[:8]
+    milk = add_task(ws, f"Buy milk {run}")
+    add_task(ws, f"Pay rent {run}")
+
+    reply = list_tasks(ws, search=f"  milk {run}  ")
+    assert [task["id"] for task in reply["tasks"]] == [milk]
+    assert reply["filters"]["search"] == f"milk {run}"
+
+
+def test_search_without_words_lists_everything(ws, client, token):
+    run = uuid.uuid4().hex[:8]
+    ids = {add_task(ws, f"Task {run} {i}") for i in range(3)}
+
+    for search in ("!!!", "   ", "\"*", "-"):
+        reply = list_tasks(ws, search=search)
+        assert {task["id"] for task in reply["tasks"]} == ids
+
+    response = client.get("/tasks", params={"search": "!!!"}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert {task["id"] for task in response.json()["tasks"]} == ids
+
+
+def test_search_matches_word_prefixes(ws):
+    run = uuid.uuid4().hex[:8]
+    milk = add_task(ws, f"Buy milk {run}")
+
+    reply = list_tasks(ws, search=f"mil {run[:4]}")
+    assert [task["id"] for task in reply["tasks"]] == [milk]
+
+
+def test_postgres_search_matches_word_prefixes_too():
+    from sqlalchemy.dialects import postgresql
+
+    import task_queries
+
+    compiled = task_queries.TaskSearch("mil, bread!").compile(dialect=postgresql.dialect())
+    assert "to_tsquery('english'" in str(compiled)
+    assert list(compiled.params.values()) == ["mil:* & bread:*"]
@@ -0,0 +1,42 @@
+import main
+
+
+def sync(ws, **message):
+    ws.send_action(action="sync_tasks", **message)
+    while True:
+        reply = ws.receive_json()
+        # tagging and delete events for this user can arrive in between
+        if reply.get("event") == "task_sync" or "error" in reply:
+            return reply
+
+
+def test_sync_tasks_needs_a_starting_point(ws):
+    reply = sync(ws)
+    assert reply["error"] == "Invalid message"
+
+
+def test_sync_tasks_pages_changes_and_deletions(ws, monkeypatch):
+    monkeypatch.setattr(main, "TAG_LOCAL_THRESHOLD", 0)
+    ws.send_action(action="add_tasks", tasks=[{"title": f"Sync {i}", "description": "paged"} for i in range(5)])
+    created = ws.receive_json()
+    assert created["event"] == "tasks_created"
+    ids = sorted(task["id"] for task in created["tasks"])
+    ws.send_action(action="delete_task", task_id=ids[1])
+
+    seen, deleted, cursor = [], [], None
+    while True:
+        reply = sync(ws, since_version=0, limit=2, cursor=cursor)
+        assert len(reply["tasks"]) + len(reply["deleted"]) <= 4
+        seen += [task["id"] for task in reply["tasks"]]
+        deleted += reply["deleted"]
+        cursor = reply["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == sorted(set(ids) - {ids[1]})
+    assert deleted == [ids[1]]
+
+
+def test_sync_tasks_accepts_an_aware_since(ws):
+    reply = sync(ws, since="2025-01-01T00:00:00Z")
+    assert reply["event"] == "task_sync"
@@ -0,0 +1,152 @@
+"""
+Messages clients send over /ws. The `action` field picks the schema, and a
+raw frame is decoded and validated in one pass by pydantic-core.
+
+The task shapes here are shared with the REST API: its request bodies and
+query parameters, and the documented shape of what both APIs send back.
+"""
+from datetime import datetime, timezone
+from typing import Annotated, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, TypeAdapter, field_validator, model_validator
+
+from tag_classifier import TAG_CATEGORIES
+
+
+class TaskIn(BaseModel):
+    title: str
+    description: str = ""
+
+
+class TaskListQuery(BaseModel):
+    cursor: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1)
+    tag: Optional[Literal[tuple(TAG_CATEGORIES)]] = None
+    completed: Optional[bool] = None
+    search: Optional[str] = Field(None, max_length=200)
+
+    @field_validator("search")
+    @classmethod
+    def blank_search_is_none(cls, search):
+        return (search or "").strip() or None
+
+
+class TaskUpdate(BaseModel):
+    completed: bool
+
+
+class TaskSummaryOut(BaseModel):
+    """A task as listings send it: the description is cut down to a summary."""
+    id: str
+    title: Optional[str]
+    completed: Optional[bool]
+    tags: str
+    summary: Optional[str]
+
+
+class TaskOut(BaseModel):
+    id: str
+    title: Optional[str]
+    description: Optional[str]
+    completed: Optional[bool]
+    tags: str
+
+
+class TaskPage(BaseModel):
+    tasks: List[TaskSummaryOut]
+    cursor: Optional[str]
+    next_cursor: Optional[str]
+    filters: dict
+    version: int
+
+
+class ClientMessage(BaseModel):
+    token: Optional[str] = None
+
+
+class GetTasks(ClientMessage, TaskListQuery):
+    action: Literal["get_tasks"]
+
+
+class GetTask(ClientMessage):
+    action: Literal["get_task"]
+    task_id: str
+
+
+class TaskStats(ClientMessage):
+    action: Literal["task_stats"]
+
+
+class SyncTasks(ClientMessage):
+    """Changes since a known version (or time), paged like get_tasks. A full listing is get_tasks' job."""
+    action: Literal["sync_tasks"]
+    since_version: Optional[int] = None
+    since: Optional[datetime] = None
+    cursor: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1)
+
+    @field_validator("since")
+    @classmethod
+    def since_as_naive_utc(cls, since):
+        # updated_at and deleted_at are naive UTC; "...Z" from a JS client would be timezone-aware
+        if since is not None and since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return since
+
+    @model_validator(mode="after")
+    def needs_a_starting_point(self):
+        if self.since_version is None and self.since is None:
+            raise ValueError("since_version or since is required, get_tasks lists everything")
+        return self
+
+
+class AddTask(ClientMessage):
+    action: Literal["add_task"]
+    task: TaskIn
+
+
+class SuggestTag(ClientMessage):
+    action: Literal["suggest_tag"]
+    task: TaskIn
+
+
+class DeleteTask(ClientMessage):
+    action: Literal["delete_task"]
+    task_id: str
+
+
+class AddTasks(ClientMessage):
+    action: Literal["add_tasks"]
+    tasks: List[TaskIn] = []
+
+
+class DeleteTasks(ClientMessage):
+    action: Literal["delete_tasks"]
+    task_ids: List[str] = []
+
+
+class CompleteTasks(ClientMessage):
+    action: Literal["complete_tasks"]
+    task_ids: List[str] = []
+    completed: bool = True
+
+
+ACTIONS = {
+    model.model_fields["action"].annotation.__args__[0]: model
+    for model in (GetTasks, GetTask, TaskStats, SyncTasks, AddTask, SuggestTag, DeleteTask, AddTasks, DeleteTasks, CompleteTasks)
+}
+
+_client_message = TypeAdapter(Annotated[Union[tuple(ACTIONS.values())], Field(discriminator="action")])
+
+
+def parse_client_message(data) -> ClientMessage:
+    """Decodes and validates one frame (str or bytes). Raises pydantic.ValidationError."""
+    return _client_message.validate_json(data)
+
+
+def validation_errors(error) -> list:
+    """The parts of a ValidationError that are safe and useful to send back to the client."""
+    return [
+        {"loc": list(e["loc"]), "msg": e["msg"], "type": e["type"]}
+        for e in error.errors(include_url=False, include_context=False, include_input=False)
+    ]
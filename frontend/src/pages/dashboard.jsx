@@ -15,6 +15,7 @@ import {
   Card,
   CardContent,
   Fab,
+  MenuItem,
   Stack,
   Typography,
 } from "@mui/material";
@@ -22,6 +23,8 @@ import AddIcon from "@mui/icons-material/Add";
 import LogoutIcon from "@mui/icons-material/Logout";
 import DeleteIcon from "@mui/icons-material/Delete";
 
+const TAGS = ["Work", "Urgent", "Personal", "Shopping", "Travel", "Health", "Learning", "Finance", "Others"];
+
 const Dashboard = () => {
   const { user, login, logout } = useAuth();
   const navigate = useNavigate();
@@ -32,6 +35,8 @@ const Dashboard = () => {
   const [snackbarOpen, setSnackbarOpen] = useState(false);
   const [snackbarMessage, setSnackbarMessage] = useState("");
   const [snackbarSeverity, setSnackbarSeverity] = useState("success");
+  const [filters, setFilters] = useState({ search: "", tag: "" });
+  const [suggestedTag, setSuggestedTag] = useState(null);
 
   const token = localStorage.getItem("token");
 
@@ -60,6 +65,10 @@ const Dashboard = () => {
 
     const newSocket = new WebSocket("wss://ami.polotrax.com/ws");
 
+    // the server may send JSON as binary frames (WS_FRAMES=binary)
+    newSocket.binaryType = "arraybuffer";
+    const decoder = new TextDecoder();
+
     setSocket(newSocket);
 
     newSocket.onopen = () => {
@@ -71,12 +80,48 @@ const Dashboard = () => {
     };
 
     newSocket.onmessage = (event) => {
-      const data = JSON.parse(event.data);
+      const data = JSON.parse(
+        typeof event.data === "string" ? event.data : decoder.decode(event.data)
+      );
       // console.log("received", data);
 
+      // the server closes the socket on these, a new login is needed
+      if (data.error === "Token expired" || data.error === "Invalid token") {
+        logout();
+        navigate("/");
+        return;
+      }
+      // suggestions are best effort, a rate-limited one just isn't shown
+      if (data.error && data.action !== "suggest_tag") {
+        setSnackbarMessage(
+          data.retry_after
+            ? `${data.error}, try again in ${Math.ceil(data.retry_after)}s`
+            : data.error
+        );
+        setSnackbarSeverity("error");
+        setSnackbarOpen(true);
+      }
       if (data.event === "task_list") {
         // console.log("task list received", data.tasks);
-        setTasks(data.tasks);
+        if (data.cursor) {
+          setTasks((prevTasks) => [...prevTasks, ...data.tasks]);
+        } else {
+          setTasks(data.tasks);
+        }
+        if (data.next_cursor) {
+          newSocket.send(
+            JSON.stringify({
+            action: "get_tasks",
+            token,
+            cursor: data.next_cursor,
+            ...data.filters,
+          })
+          );
+        }
+      }
+      // a change too big to relay between server workers, reload the list
+      if (data.event === "resync") {
+        newSocket.send(JSON.stringify({ action: "get_tasks", token }));
       }
       if (data.event === "task_created") {
         // console.log("new task received", data.task);
@@ -88,6 +133,38 @@ const Dashboard = () => {
           prevTasks.filter((task) => task.id !== data.task_id)
         );
       }
+      if (data.event === "tasks_created") {
+        setTasks((prevTasks) => [...prevTasks, ...data.tasks]);
+      }
+      if (data.event === "tasks_deleted") {
+        const deleted = new Set(data.task_ids);
+        setTasks((prevTasks) => prevTasks.filter((task) => !deleted.has(task.id)));
+      }
+      if (data.event === "tasks_completed") {
+        const updated = new Set(data.task_ids);
+        setTasks((prevTasks) =>
+          prevTasks.map((task) =>
+            updated.has(task.id) ? { ...task, completed: data.completed } : task
+          )
+        );
+      }
+      if (data.event === "task_detail") {
+        setTasks((prevTasks) =>
+          prevTasks.map((task) =>
+            task.id === data.task.id ? { ...task, ...data.task } : task
+          )
+        );
+      }
+      if (data.event === "tag_suggestion") {
+        setSuggestedTag(data.tags);
+      }
+      if (data.event === "task_tagged") {
+        setTasks((prevTasks) =>
+          prevTasks.map((task) =>
+            task.id === data.task_id ? { ...task, tags: data.tags } : task
+          )
+        );
+      }
     };
 
     newSocket.onerror = (error) => {
@@ -101,6 +178,40 @@ const Dashboard = () => {
     return () => newSocket.close();
   }, [token, navigate]);
 
+  // filtering and search run on the server, only matching tasks are sent
+  useEffect(() => {
+    if (!socket || socket.readyState !== WebSocket.OPEN) return;
+
+    const timer = setTimeout(() => {
+      socket.send(
+        JSON.stringify({
+          action: "get_tasks",
+          token,
+          search: filters.search || null,
+          tag: filters.tag || null,
+        })
+      );
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [filters]);
+
+  // tags the task while it's being typed, so add_task can reuse the answer
+  useEffect(() => {
+    setSuggestedTag(null);
+    if (!open || !newTask.title || !socket || socket.readyState !== WebSocket.OPEN) return;
+
+    const timer = setTimeout(() => {
+      socket.send(
+        JSON.stringify({
+          action: "suggest_tag",
+          token,
+          task: { title: newTask.title, description: newTask.description },
+        })
+      );
+    }, 500);
+    return () => clearTimeout(timer);
+  }, [open, newTask]);
+
   const handleAddTask = () => {
     if (!newTask.title || !newTask.description || !socket) return;
 
@@ -121,6 +232,15 @@ const Dashboard = () => {
     setSnackbarOpen(true);
   };
 
+  // listings only carry a summary, the full description is fetched on demand
+  const handleExpandTask = (task) => {
+    if (!socket || task.description !== undefined) return;
+
+    socket.send(
+      JSON.stringify({ action: "get_task", token: token, task_id: task.id })
+    );
+  };
+
   const handleDeleteTask = (taskId) => {
     if (!socket) return;
 
@@ -168,6 +288,29 @@ const Dashboard = () => {
         </LogoutIcon>
       </Stack>
 
+      <Stack direction="row" spacing={2} sx={{ mb: 3 }}>
+        <TextField
+          placeholder="Search tasks"
+          value={filters.search}
+          onChange={(e) => setFilters({ ...filters, search: e.target.value })}
+          sx={{ flex: 1, backgroundColor: "white", borderRadius: 1 }}
+        />
+        <TextField
+          select
+          value={filters.tag}
+          onChange={(e) => setFilters({ ...filters, tag: e.target.value })}
+          SelectProps={{ displayEmpty: true }}
+          sx={{ width: 200, backgroundColor: "white", borderRadius: 1 }}
+        >
+          <MenuItem value="">All tags</MenuItem>
+          {TAGS.map((tag) => (
+            <MenuItem key={tag} value={tag}>
+              {tag}
+            </MenuItem>
+          ))}
+        </TextField>
+      </Stack>
+
       {/* Task List */}
       <Stack spacing={2}>
         {tasks.map((task) => (
@@ -188,7 +331,7 @@ const Dashboard = () => {
               },
             }}
           >
-            <CardContent sx={{ flex: 1 }}>
+            <CardContent sx={{ flex: 1 }} onClick={() => handleExpandTask(task)}>
               <Typography
                 variant="h6"
                 sx={{
@@ -211,7 +354,7 @@ const Dashboard = () => {
                   opacity: 0.9,
                 }}
               >
-                {task.description}
+                {task.description ?? task.summary}
               </Typography>
             </CardContent>
 
@@ -272,6 +415,11 @@ const Dashboard = () => {
             }
             style={{ width: "100%", marginBottom: 10, minHeight: 60 }}
           />
+          {suggestedTag && (
+            <Typography variant="body2" sx={{ color: "#aaa" }}>
+              Suggested tag: {suggestedTag}
+            </Typography>
+          )}
           <DialogActions>
             <Button onClick={() => setOpen(false)}>Cancel</Button>
             <Button onClick={handleAddTask} color="primary">